@@ -0,0 +1,232 @@
+import logging
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Contact, PhoneDirectory, PhoneNameCount, SpamReport, SpamReportRollup
+from .utils import normalize_phone_number, stored_forms
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def _top(name_counts):
+    # Most frequent first, ties broken by name
+    return min(name_counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _recount_names(phone_number):
+    """
+    Recount a number's contact names from the contacts and store the
+    counts. Returns (name, frequency) of the most common name, or ('', 0)
+    if nobody has it saved.
+    """
+    name_counts = dict(
+        Contact.objects.filter(phone_number__in=stored_forms(phone_number))
+        .values_list('name')
+        .annotate(frequency=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        PhoneNameCount.objects.filter(phone_number=phone_number).delete()
+        PhoneNameCount.objects.bulk_create(
+            PhoneNameCount(phone_number=phone_number, name=name, count=count)
+            for name, count in name_counts.items()
+        )
+    if not name_counts:
+        return '', 0
+    return _top(name_counts)
+
+
+def count_reports(phone_numbers):
+    """
+    Total spam reports per number: raw reports plus those compacted into
+    monthly rollups.
+    """
+    phone_numbers = set(phone_numbers)
+    counts = dict.fromkeys(phone_numbers, 0)
+    raw = (
+        SpamReport.objects.filter(phone_number__in=phone_numbers)
+        .values_list('phone_number')
+        .annotate(reports=Count('id'))
+    )
+    rolled_up = (
+        SpamReportRollup.objects.filter(phone_number__in=phone_numbers)
+        .values_list('phone_number')
+        .annotate(reports=Sum('report_count'))
+    )
+    for phone_number, reports in [*raw, *rolled_up]:
+        counts[phone_number] += reports
+    return counts
+
+
+def build_entry(phone_number):
+    """
+    Create or overwrite the directory entry for a number from the source
+    tables. Returns None without writing if nothing is known about it.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if not phone_number:
+        return None
+
+    registered_user = User.objects.filter(phone_number__in=stored_forms(phone_number)).first()
+    top_name, top_name_count = _recount_names(phone_number)
+    spam_count = count_reports([phone_number])[phone_number]
+    if registered_user is None and not top_name_count and not spam_count:
+        return None
+
+    entry, _ = PhoneDirectory.objects.update_or_create(
+        phone_number=phone_number,
+        defaults={
+            'registered_user': registered_user,
+            'top_name': top_name,
+            'top_name_count': top_name_count,
+            'spam_count': spam_count,
+        },
+    )
+    return entry
+
+
+def add_contact_name(phone_number, name):
+    """
+    Count a newly saved contact name for a number and make it the number's
+    name guess if it overtook the current one.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if not phone_number:
+        return
+
+    names = PhoneNameCount.objects.filter(phone_number=phone_number, name=name)
+    if not names.update(count=F('count') + 1):
+        try:
+            with transaction.atomic():
+                PhoneNameCount.objects.create(phone_number=phone_number, name=name, count=1)
+        except IntegrityError:
+            # Created concurrently
+            names.update(count=F('count') + 1)
+    count = names.values_list('count', flat=True).first()
+
+    # Only the name that changed can overtake the current guess
+    updated = PhoneDirectory.objects.filter(phone_number=phone_number).filter(
+        Q(top_name=name) | Q(top_name_count__lt=count) | Q(top_name_count=count, top_name__gt=name)
+    ).update(top_name=name, top_name_count=count)
+    if not updated and not PhoneDirectory.objects.filter(phone_number=phone_number).exists():
+        build_entry(phone_number)
+
+
+def remove_contact_name(phone_number, name):
+    """
+    Uncount a contact name for a number after the contact was deleted or
+    changed. The name guess is only recomputed if this name was the guess.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if not phone_number:
+        return
+
+    names = PhoneNameCount.objects.filter(phone_number=phone_number, name=name)
+    names.update(count=F('count') - 1)
+    names.filter(count__lte=0).delete()
+
+    top = PhoneNameCount.objects.filter(phone_number=phone_number).order_by('-count', 'name')
+    PhoneDirectory.objects.filter(phone_number=phone_number, top_name=name).update(
+        top_name=Coalesce(Subquery(top.values('name')[:1]), Value('')),
+        top_name_count=Coalesce(Subquery(top.values('count')[:1]), Value(0)),
+    )
+
+
+def record_spam_report(phone_number):
+    """
+    Increment the spam counter for a number after a new spam report.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if not phone_number:
+        return
+
+    updated = PhoneDirectory.objects.filter(phone_number=phone_number).update(
+        spam_count=F('spam_count') + 1
+    )
+    if not updated:
+        # First time we hear about this number; count from the source tables
+        # so a concurrent report is not lost.
+        build_entry(phone_number)
+
+
+def refresh_spam_count(phone_number):
+    """
+    Recount a number's spam reports after a report was changed or deleted.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    if not phone_number:
+        return
+
+    updated = PhoneDirectory.objects.filter(phone_number=phone_number).update(
+        spam_count=count_reports([phone_number])[phone_number]
+    )
+    if not updated:
+        build_entry(phone_number)
+
+
+def record_registration(user):
+    """
+    Attach a newly registered user to the directory entry for their number.
+    A single UPDATE; numbers without an entry get one on their first lookup.
+    """
+    phone_number = normalize_phone_number(user.phone_number)
+    if not phone_number:
+        return
+
+    PhoneDirectory.objects.filter(phone_number=phone_number).update(registered_user=user)
+
+
+def rebuild_directory(batch_size=1000):
+    """
+    Rebuild the whole directory from the source tables. Returns the number
+    of entries written.
+    """
+    entries = {}
+
+    def entry_for(phone_number):
+        # Source rows may hold the number without its leading '+'
+        phone_number = normalize_phone_number(phone_number)
+        if phone_number not in entries:
+            entries[phone_number] = PhoneDirectory(phone_number=phone_number)
+        return entries[phone_number]
+
+    for user_id, phone_number in User.objects.values_list('id', 'phone_number').iterator():
+        entry_for(phone_number).registered_user_id = user_id
+
+    # Spellings of one number are merged before picking the most common name
+    name_counts = {}
+    rows = Contact.objects.values_list('phone_number', 'name').annotate(frequency=Count('id')).order_by()
+    for phone_number, name, frequency in rows.iterator():
+        counts = name_counts.setdefault(entry_for(phone_number).phone_number, {})
+        counts[name] = counts.get(name, 0) + frequency
+    for phone_number, counts in name_counts.items():
+        entry = entries[phone_number]
+        entry.top_name, entry.top_name_count = _top(counts)
+
+    spam_counts = SpamReport.objects.values('phone_number').annotate(reports=Count('id'))
+    for row in spam_counts.iterator():
+        entry_for(row['phone_number']).spam_count += row['reports']
+
+    # Reports compacted out of SpamReport still count towards the total
+    rolled_up = SpamReportRollup.objects.values('phone_number').annotate(reports=Sum('report_count'))
+    for row in rolled_up.iterator():
+        entry_for(row['phone_number']).spam_count += row['reports']
+
+    with transaction.atomic():
+        PhoneDirectory.objects.all().delete()
+        PhoneDirectory.objects.bulk_create(entries.values(), batch_size=batch_size)
+        PhoneNameCount.objects.all().delete()
+        PhoneNameCount.objects.bulk_create(
+            (
+                PhoneNameCount(phone_number=phone_number, name=name, count=count)
+                for phone_number, counts in name_counts.items()
+                for name, count in counts.items()
+            ),
+            batch_size=batch_size
+        )
+
+    logger.info(f"Rebuilt phone directory with {len(entries)} entries")
+    return len(entries)
@@ -0,0 +1,147 @@
+import csv
+import json
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import Count, Min, Max, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import SpamReport, SpamReportRollup
+from .scoring import get_likelihoods
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_FIELDS = ('phone_number', 'report_count', 'spam_likelihood', 'first_seen', 'last_seen')
+DEFAULT_CHUNK_SIZE = 2000
+# Reports are stamped when created but become visible when their transaction
+# commits, so the next watermark trails the export start by this much. The
+# overlap only re-exports whole per-number aggregates, which consumers upsert.
+WATERMARK_SAFETY_MARGIN = timedelta(minutes=5)
+
+
+def parse_watermark(value):
+    """
+    Parse an ISO 8601 watermark; naive values are taken as UTC.
+    Raises ValueError for unparseable input.
+    """
+    watermark = parse_datetime(value)
+    if watermark is None:
+        raise ValueError(f"Invalid watermark timestamp: {value}")
+    if timezone.is_naive(watermark):
+        watermark = timezone.make_aware(watermark, dt_timezone.utc)
+    return watermark
+
+
+def next_watermark():
+    """
+    Watermark to hand out with an export that starts now.
+    """
+    return timezone.now() - WATERMARK_SAFETY_MARGIN
+
+
+def spam_aggregates(since=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield per-number spam aggregates ordered by phone number.
+
+    Rows are streamed with QuerySet.iterator(), which uses a server-side
+    cursor on PostgreSQL, so memory stays flat regardless of table size.
+    Raw reports and the monthly rollups of compacted ones are aggregated
+    separately and merged by number. With `since`, only numbers reported
+    after the watermark are emitted, but their aggregates still cover all
+    reports.
+    """
+    reports = SpamReport.objects.all()
+    rollups = SpamReportRollup.objects.all()
+    if since is not None:
+        # Narrow to recently reported numbers with the created_at index
+        # before aggregating, rather than filtering the aggregates
+        recent = SpamReport.objects.filter(created_at__gt=since).values('phone_number')
+        reports = reports.filter(phone_number__in=recent)
+        rollups = rollups.filter(phone_number__in=recent)
+    raw_rows = (
+        reports.values('phone_number')
+        .annotate(
+            report_count=Count('id'),
+            first_seen=Min('created_at'),
+            last_seen=Max('created_at'),
+        )
+        .order_by('phone_number')
+    )
+    rollup_rows = (
+        rollups.values('phone_number')
+        .annotate(
+            report_count=Sum('report_count'),
+            first_seen=Min('first_seen'),
+            last_seen=Max('last_seen'),
+        )
+        .order_by('phone_number')
+    )
+
+    chunk = []
+    for row in _merge_by_number(
+        raw_rows.iterator(chunk_size=chunk_size), rollup_rows.iterator(chunk_size=chunk_size)
+    ):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield from _with_likelihoods(chunk)
+            chunk = []
+    yield from _with_likelihoods(chunk)
+
+
+def _merge_by_number(left, right):
+    # Both inputs are ordered by phone number; rows for the same number combine
+    left_row, right_row = next(left, None), next(right, None)
+    while left_row is not None or right_row is not None:
+        if right_row is None or (left_row is not None and left_row['phone_number'] < right_row['phone_number']):
+            yield left_row
+            left_row = next(left, None)
+        elif left_row is None or right_row['phone_number'] < left_row['phone_number']:
+            yield right_row
+            right_row = next(right, None)
+        else:
+            yield {
+                'phone_number': left_row['phone_number'],
+                'report_count': left_row['report_count'] + right_row['report_count'],
+                'first_seen': min(left_row['first_seen'], right_row['first_seen']),
+                'last_seen': max(left_row['last_seen'], right_row['last_seen']),
+            }
+            left_row, right_row = next(left, None), next(right, None)
+
+
+def _with_likelihoods(rows):
+    # One score lookup per chunk rather than per row
+    likelihoods = get_likelihoods(row['phone_number'] for row in rows)
+    for row in rows:
+        row['spam_likelihood'] = likelihoods[row['phone_number']]
+        yield row
+
+
+def _serialize(row):
+    serialized = {field: row[field] for field in EXPORT_FIELDS}
+    serialized['first_seen'] = row['first_seen'].isoformat()
+    serialized['last_seen'] = row['last_seen'].isoformat()
+    return serialized
+
+
+def render_ndjson(rows):
+    for row in rows:
+        yield json.dumps(_serialize(row)) + '\n'
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back to csv.writer's caller.
+    """
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        serialized = _serialize(row)
+        yield writer.writerow([serialized[field] for field in EXPORT_FIELDS])
+
+
+def render_export(rows, export_format):
+    if export_format == 'csv':
+        return render_csv(rows)
+    return render_ndjson(rows)
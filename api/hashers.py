@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, ScryptPasswordHasher, make_password
+)
+
+
+class ConfigurableScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt with cost parameters taken from settings.PASSWORD_HASHER_PARAMS.
+    """
+    work_factor = settings.PASSWORD_HASHER_PARAMS.get('scrypt_work_factor', ScryptPasswordHasher.work_factor)
+    block_size = settings.PASSWORD_HASHER_PARAMS.get('scrypt_block_size', ScryptPasswordHasher.block_size)
+    parallelism = settings.PASSWORD_HASHER_PARAMS.get('scrypt_parallelism', ScryptPasswordHasher.parallelism)
+
+
+class ConfigurableArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2 with cost parameters taken from settings.PASSWORD_HASHER_PARAMS.
+    Requires the optional argon2-cffi package.
+    """
+    time_cost = settings.PASSWORD_HASHER_PARAMS.get('argon2_time_cost', Argon2PasswordHasher.time_cost)
+    memory_cost = settings.PASSWORD_HASHER_PARAMS.get('argon2_memory_cost', Argon2PasswordHasher.memory_cost)
+    parallelism = settings.PASSWORD_HASHER_PARAMS.get('argon2_parallelism', Argon2PasswordHasher.parallelism)
+
+
+# Bounded pool so a sign-up spike cannot run more concurrent hashes than
+# there are cores; the hash functions release the GIL while they work.
+_hashing_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    thread_name_prefix='password-hashing'
+)
+
+
+def hash_password(raw_password):
+    """
+    Hash a password with the preferred hasher on the bounded hashing pool.
+    """
+    return _hashing_pool.submit(make_password, raw_password).result()
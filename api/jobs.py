@@ -0,0 +1,151 @@
+"""
+Lightweight database-backed job queue.
+
+Jobs are rows in the Job table. `manage.py run_worker` claims them in
+priority order (SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL) and runs
+them on a process pool. Failed jobs are retried with exponential backoff,
+and a deduplication key keeps duplicate work out of the queue.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Job
+from .tasks import TASKS
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 10  # seconds; doubles with every attempt
+RETRY_MAX_DELAY = 60 * 60
+# Workers refresh the heartbeat of their running jobs this often; a job
+# whose heartbeat is older than the lease lost its worker and is requeued
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+LEASE_TIMEOUT = timedelta(minutes=2)
+
+
+def enqueue(name, payload=None, priority=0, dedup_key=None, max_attempts=3, created_by=None):
+    """
+    Queue a job and return it. If a queued or running job with the same
+    dedup_key exists, that job is returned instead.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Unknown task: {name}")
+
+    if dedup_key:
+        existing = Job.objects.filter(
+            dedup_key=dedup_key, status__in=[Job.QUEUED, Job.RUNNING]
+        ).first()
+        if existing:
+            return existing
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload or {},
+                priority=priority,
+                dedup_key=dedup_key,
+                max_attempts=max_attempts,
+                created_by=created_by,
+            )
+    except IntegrityError:
+        # Lost a race with another enqueue of the same key
+        existing = Job.objects.filter(
+            dedup_key=dedup_key, status__in=[Job.QUEUED, Job.RUNNING]
+        ).first()
+        if existing is None:
+            raise
+        return existing
+
+
+def claim_jobs(limit):
+    """
+    Atomically mark up to `limit` due jobs as running and return their ids.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job_ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=now)
+            .order_by('-priority', 'run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if job_ids:
+            Job.objects.filter(id__in=job_ids).update(status=Job.RUNNING, started_at=now, heartbeat_at=now)
+    return job_ids
+
+
+def heartbeat(job_ids):
+    """
+    Renew the lease on jobs this worker is still running.
+    """
+    return Job.objects.filter(id__in=job_ids, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs():
+    """
+    Put jobs whose worker stopped heartbeating back on the queue. Long jobs
+    on a live worker keep their lease however long they run.
+    """
+    cutoff = timezone.now() - LEASE_TIMEOUT
+    return Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=Job.RUNNING
+    ).update(status=Job.QUEUED, run_after=timezone.now())
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _record_failure(job, error):
+    job.last_error = error
+    if job.attempts < job.max_attempts:
+        job.status = Job.QUEUED
+        job.run_after = timezone.now() + retry_delay(job.attempts)
+        logger.warning(f"Job {job} failed (attempt {job.attempts}), retrying")
+    else:
+        job.status = Job.FAILED
+        job.finished_at = timezone.now()
+        logger.error(f"Job {job} failed permanently")
+
+
+def _save_outcome(job):
+    job.save(update_fields=['attempts', 'result', 'last_error', 'status', 'run_after', 'finished_at'])
+
+
+def run_job(job_id):
+    """
+    Execute a claimed job and record its outcome. Runs in a worker process.
+    """
+    # Worker processes are long-lived, so apply CONN_MAX_AGE between jobs
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    job.attempts += 1
+
+    try:
+        job.result = TASKS[job.name](**job.payload)
+    except Exception:
+        _record_failure(job, traceback.format_exc())
+    else:
+        job.status = Job.SUCCEEDED
+        job.last_error = ''
+        job.finished_at = timezone.now()
+        logger.info(f"Job {job} succeeded")
+
+    _save_outcome(job)
+    return job.status
+
+
+def record_crash(job_id, error):
+    """
+    Record a job whose worker process died before it could report back.
+    """
+    job = Job.objects.get(pk=job_id)
+    job.attempts += 1
+    _record_failure(job, f"Worker process crashed: {error}")
+    _save_outcome(job)
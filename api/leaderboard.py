@@ -0,0 +1,209 @@
+"""
+Rolling "most reported numbers" leaderboards kept in the shared cache.
+
+Each window is split into time buckets (minutes for the last hour, hours for
+the last day). A report increments an exact per-bucket counter with
+cache.incr() and updates the bucket's bounded top-K map. Reads take the
+leading numbers from the live buckets' top maps, rank them by their exact
+counters and cache the list for a few seconds, so a read is a slice of a
+precomputed list. `reconcile()` rebuilds the buckets from the
+SpamReport table to correct any drift.
+
+The buckets live in the shared cache (see CACHES in settings), so every web
+process counts into them and sees reconciled counts. Reports are only
+counted as they arrive on Redis: the database cache fallback would add
+several queries per report, so there the leaderboard is as fresh as the
+last reconciliation.
+"""
+import heapq
+import logging
+from datetime import datetime, timezone as dt_timezone
+from operator import itemgetter
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from .models import SpamReport
+from .utils import shared_cache, shared_cache_is_database
+
+logger = logging.getLogger(__name__)
+
+# window name -> (bucket length in seconds, buckets per window, Trunc kind)
+WINDOWS = {
+    'hour': (60, 60, 'minute'),
+    'day': (60 * 60, 24, 'hour'),
+}
+# Numbers tracked per bucket
+BUCKET_CAPACITY = 500
+# Longest leaderboard that can be requested
+MAX_SIZE = 100
+# Numbers whose exact counts are read when merging buckets
+CANDIDATES = 2 * MAX_SIZE
+# How long a merged leaderboard is served before being rebuilt from buckets
+BOARD_TTL = 5
+LOCK_TIMEOUT = 2
+
+
+def _bucket(window, at):
+    bucket_seconds = WINDOWS[window][0]
+    return int(at.timestamp() // bucket_seconds)
+
+
+def _bucket_ttl(window):
+    bucket_seconds, bucket_count, _ = WINDOWS[window]
+    return bucket_seconds * (bucket_count + 1)
+
+
+def _count_key(window, bucket, phone_number):
+    return f'leaderboard:{window}:{bucket}:count:{phone_number}'
+
+
+def _top_key(window, bucket):
+    return f'leaderboard:{window}:{bucket}:top'
+
+
+def _board_key(window):
+    return f'leaderboard:{window}:board'
+
+
+def _bounded(counts):
+    if len(counts) <= BUCKET_CAPACITY:
+        return counts
+    return dict(heapq.nlargest(BUCKET_CAPACITY, counts.items(), key=itemgetter(1)))
+
+
+def _update_top(window, bucket, phone_number, count):
+    cache = shared_cache()
+    lock_key = f'{_top_key(window, bucket)}:lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Another report is updating the map. The exact counter is already
+        # incremented; the number re-enters the top map on its next report
+        # or at reconciliation
+        return
+
+    try:
+        top = cache.get(_top_key(window, bucket)) or {}
+        if phone_number in top or len(top) < BUCKET_CAPACITY:
+            top[phone_number] = count
+        else:
+            weakest = min(top, key=top.get)
+            if count <= top[weakest]:
+                return
+            del top[weakest]
+            top[phone_number] = count
+        cache.set(_top_key(window, bucket), top, _bucket_ttl(window))
+    finally:
+        cache.delete(lock_key)
+
+
+def _increment(key, ttl):
+    cache = shared_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # First report in the bucket, unless another one just created it
+        if cache.add(key, 1, ttl):
+            return 1
+        return cache.incr(key)
+
+
+def record_report(phone_number, at=None):
+    """
+    Count a new report in every window's current bucket.
+    """
+    if shared_cache_is_database():
+        return
+    at = at or timezone.now()
+    for window in WINDOWS:
+        bucket = _bucket(window, at)
+        count = _increment(_count_key(window, bucket, phone_number), _bucket_ttl(window))
+        _update_top(window, bucket, phone_number, count)
+
+
+def _live_buckets(window, now):
+    current = _bucket(window, now)
+    return range(current - WINDOWS[window][1] + 1, current + 1)
+
+
+def _merge(window, now):
+    cache = shared_cache()
+    buckets = _live_buckets(window, now)
+    tops = cache.get_many([_top_key(window, bucket) for bucket in buckets])
+    totals = {}
+    for top in tops.values():
+        for phone_number, count in top.items():
+            totals[phone_number] = totals.get(phone_number, 0) + count
+
+    # Top maps can hold stale counts and miss buckets where a number fell out
+    # of the top-K, so the leading candidates are ranked by their exact
+    # per-bucket counters instead
+    candidates = heapq.nlargest(CANDIDATES, totals, key=totals.get)
+    keys = {
+        _count_key(window, bucket, phone_number): phone_number
+        for phone_number in candidates for bucket in buckets
+    }
+    exact = dict.fromkeys(candidates, 0)
+    for key, count in cache.get_many(list(keys)).items():
+        exact[keys[key]] += count
+    return [
+        {'phone_number': phone_number, 'reports': count}
+        for phone_number, count in heapq.nlargest(MAX_SIZE, exact.items(), key=itemgetter(1))
+        if count
+    ]
+
+
+def get_leaderboard(window, size=10):
+    """
+    Top `size` most-reported numbers in the window.
+    """
+    cache = shared_cache()
+    board = cache.get(_board_key(window))
+    if board is None:
+        board = _merge(window, timezone.now())
+        cache.set(_board_key(window), board, BOARD_TTL)
+    return board[:size]
+
+
+def reconcile(window):
+    """
+    Rebuild a window's buckets from the SpamReport table. Returns
+    (exact leaderboard, numbers whose cached count was wrong).
+    """
+    bucket_seconds, _, trunc_kind = WINDOWS[window]
+    now = timezone.now()
+    buckets = _live_buckets(window, now)
+    since = datetime.fromtimestamp(buckets[0] * bucket_seconds, tz=dt_timezone.utc)
+
+    cached = {row['phone_number']: row['reports'] for row in _merge(window, now)}
+
+    rows = (
+        SpamReport.objects.filter(created_at__gte=since)
+        .annotate(bucket_start=Trunc('created_at', trunc_kind, tzinfo=dt_timezone.utc))
+        .values('bucket_start', 'phone_number')
+        .annotate(reports=Count('id'))
+    )
+    counts = {bucket: {} for bucket in buckets}
+    for row in rows.iterator():
+        bucket = _bucket(window, row['bucket_start'])
+        if bucket in counts:
+            counts[bucket][row['phone_number']] = row['reports']
+
+    cache = shared_cache()
+    ttl = _bucket_ttl(window)
+    cache.set_many(
+        {
+            _count_key(window, bucket, phone_number): count
+            for bucket, bucket_counts in counts.items()
+            for phone_number, count in bucket_counts.items()
+        },
+        ttl
+    )
+    cache.set_many({_top_key(window, bucket): _bounded(bucket_counts) for bucket, bucket_counts in counts.items()}, ttl)
+
+    board = _merge(window, now)
+    cache.set(_board_key(window), board, BOARD_TTL)
+
+    drift = [
+        row['phone_number'] for row in board if cached.get(row['phone_number']) != row['reports']
+    ]
+    logger.info(f"Reconciled {window} leaderboard; {len(drift)} numbers corrected")
+    return board, drift
@@ -0,0 +1,73 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+from api.views import RegistrationView
+
+
+class Command(BaseCommand):
+    help = 'Measures registration throughput against a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duplicates', type=float, default=0.1,
+                            help='Fraction of requests that reuse an existing username')
+
+    def handle(self, *args, **options):
+        # Register into a separate test database (as check_query_plans
+        # does) so live tables are never written
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            errors = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if errors:
+            raise CommandError(f'{errors} registrations failed unexpectedly')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def benchmark(self, options):
+        num_requests = options['requests']
+        run_id = random.randint(1000, 9999)
+        factory = APIRequestFactory()
+        view = RegistrationView.as_view()
+
+        def payload(i):
+            # Some requests collide on purpose to exercise the IntegrityError path
+            username_index = 0 if random.random() < options['duplicates'] else i
+            return {
+                'username': f'bench_{run_id}_{username_index}',
+                'password': 'bench-pass-123',
+                'phone_number': f'+1{run_id}{i:07d}',
+            }
+
+        def register(i):
+            try:
+                request = factory.post('/api/auth/register/', payload(i), format='json')
+                start = time.perf_counter()
+                response = view(request)
+                return response.status_code, time.perf_counter() - start
+            finally:
+                connection.close()
+
+        self.stdout.write(f'Registering {num_requests} users with concurrency {options["concurrency"]}...')
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(register, range(num_requests)))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        created = sum(1 for code, _ in results if code == 201)
+        rejected = sum(1 for code, _ in results if code == 400)
+        errors = num_requests - created - rejected
+
+        self.stdout.write(f'Created: {created}, rejected duplicates: {rejected}, errors: {errors}')
+        self.stdout.write(f'Throughput: {num_requests / elapsed:.1f} req/s')
+        self.stdout.write(
+            f'Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+            f'p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms'
+        )
+        return errors
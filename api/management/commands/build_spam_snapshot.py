@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.snapshots import build_snapshot, prune_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Builds the next versioned binary spam-list snapshot and its delta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=settings.SPAM_SNAPSHOT_THRESHOLD,
+                            help='Minimum spam likelihood (percent) for a number to be listed')
+        parser.add_argument('--min-reporters', type=int, default=settings.SPAM_SNAPSHOT_MIN_REPORTERS,
+                            help='Minimum number of users who reported a number for it to be listed')
+        parser.add_argument('--keep', type=int, default=10,
+                            help='Number of snapshot versions to keep on disk')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Building spam snapshot...')
+        version = build_snapshot(threshold=options['threshold'], min_reporters=options['min_reporters'])
+        prune_snapshots(options['keep'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully built spam snapshot v{version}'))
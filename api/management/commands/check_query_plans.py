@@ -0,0 +1,109 @@
+import random
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from api.directory import rebuild_directory
+from api.models import Contact, SpamReport
+from api.query_plans import run_checks
+from api.scoring import rebuild_scores
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Seeds a dataset and fails if a hot-path query plan regresses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--contacts-per-user', type=int, default=50)
+        parser.add_argument('--spam-reports', type=int, default=20000)
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Check plans read-only against the existing data instead of '
+                                 'seeding a throwaway test database')
+        parser.add_argument('--show-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['no_seed']:
+            failures = self.check_plans(options)
+        else:
+            # Seed a separate test database (as the test runner would) so the
+            # live tables are neither written nor locked
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.seed(options)
+                failures = self.check_plans(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if failures:
+            raise CommandError(f'Query plan regressions in: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All hot-path query plans use their indexes'))
+
+    def check_plans(self, options):
+        sample = self.sample()
+        if sample is None:
+            raise CommandError('No data to sample; run without --no-seed')
+        return self.report(run_checks(sample), options['show_plans'])
+
+    def seed(self, options):
+        self.stdout.write('Seeding plan-check dataset...')
+        run_id = random.randint(100, 999)
+
+        def phone():
+            return f'+1{random.randint(2000000000, 9999999999)}'
+
+        User.objects.bulk_create(
+            [
+                User(username=f'plancheck_{run_id}_{i}', phone_number=f'+1{run_id}{i:07d}', password='!')
+                for i in range(options['users'])
+            ],
+            batch_size=1000
+        )
+        users = list(User.objects.filter(username__startswith=f'plancheck_{run_id}_'))
+
+        # Draw numbers from a shared pool so numbers appear in many address books
+        pool = [phone() for _ in range(max(len(users) * options['contacts_per_user'] // 10, 1))]
+        contacts = []
+        for user in users:
+            for phone_number in set(random.sample(pool, min(options['contacts_per_user'], len(pool)))):
+                contacts.append(Contact(user=user, name=f'Contact {phone_number[-4:]}', phone_number=phone_number))
+        Contact.objects.bulk_create(contacts, batch_size=5000)
+
+        reports = {
+            (random.choice(users).id, random.choice(pool))
+            for _ in range(options['spam_reports'])
+        }
+        SpamReport.objects.bulk_create(
+            [SpamReport(reported_by_id=user_id, phone_number=phone_number) for user_id, phone_number in reports],
+            batch_size=5000
+        )
+
+        rebuild_directory()
+        rebuild_scores()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def sample(self):
+        # A random point in the primary key range, rather than ORDER BY RANDOM()
+        ids = SpamReport.objects.aggregate(low=Min('id'), high=Max('id'))
+        if ids['low'] is None:
+            return None
+        report = SpamReport.objects.filter(id__gte=random.randint(ids['low'], ids['high'])).order_by('id').first()
+        if report is None:
+            return None
+        return {'phone_number': report.phone_number, 'user_id': report.reported_by_id}
+
+    def report(self, results, show_plans):
+        failures = []
+        for result in results:
+            if result.ok:
+                self.stdout.write(f'  ok    {result.check.name}')
+            else:
+                failures.append(result.check.name)
+                self.stdout.write(self.style.ERROR(f'  FAIL  {result.check.name}'))
+                for violation in result.violations:
+                    self.stdout.write(f'          {violation}')
+            if show_plans or not result.ok:
+                self.stdout.write(result.plan)
+        return failures
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.partitioning import ensure_partitions
+from api.retention import compact
+
+
+class Command(BaseCommand):
+    help = 'Compacts spam reports past the retention window and maintains report partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.SPAM_REPORT_RETENTION_DAYS)
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Monthly partitions to keep created ahead of time (partitioned tables only)')
+
+    def handle(self, *args, **options):
+        if ensure_partitions(months_ahead=options['months_ahead']):
+            self.stdout.write('Upcoming monthly partitions are in place')
+
+        compacted = compact(retention_days=options['retention_days'])
+        for month in compacted:
+            self.stdout.write(f'Compacted {month:%Y-%m}')
+        self.stdout.write(self.style.SUCCESS(f'Successfully compacted {len(compacted)} months'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.partitioning import convert_to_partitioned, ensure_partitions, revert_partitioning
+
+
+class Command(BaseCommand):
+    help = 'Converts the spam report table to monthly partitions (PostgreSQL), or back with --revert'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revert', action='store_true',
+                            help='Turn a partitioned table back into the plain table')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Monthly partitions to create ahead of time')
+
+    def handle(self, *args, **options):
+        if options['revert']:
+            reverted = revert_partitioning()
+            self.stdout.write(self.style.SUCCESS(
+                'Reverted spam reports to a plain table' if reverted else 'Spam reports are not partitioned'
+            ))
+            return
+
+        try:
+            converted = convert_to_partitioned(months_ahead=options['months_ahead'])
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+        ensure_partitions(months_ahead=options['months_ahead'])
+        self.stdout.write(self.style.SUCCESS(
+            'Converted spam reports to a partitioned table' if converted else 'Spam reports are already partitioned'
+        ))
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from api.models import Contact, SpamReport
+from api.directory import rebuild_directory
+from api.scoring import rebuild_scores
 from faker import Faker
 import random
 
@@ -51,4 +53,10 @@ class Command(BaseCommand):
                 phone_number=contact.phone_number
             )
 
+        self.stdout.write('Rebuilding phone directory...')
+        rebuild_directory()
+
+        self.stdout.write('Scoring spam reports...')
+        rebuild_scores()
+
         self.stdout.write(self.style.SUCCESS('Successfully populated the database')) 
\ No newline at end of file
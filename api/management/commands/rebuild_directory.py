@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.directory import rebuild_directory
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the phone directory projection from users, contacts and spam reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding phone directory...')
+        total = rebuild_directory(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {total} directory entries'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from api import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the cached spam leaderboards from the spam report table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', choices=sorted(leaderboard.WINDOWS),
+                            help='Only reconcile this window (default: all)')
+        parser.add_argument('--show', type=int, default=0,
+                            help='Print the top N numbers of each reconciled window')
+
+    def handle(self, *args, **options):
+        windows = [options['window']] if options['window'] else list(leaderboard.WINDOWS)
+        for window in windows:
+            self.stdout.write(f'Reconciling {window} leaderboard...')
+            board, drift = leaderboard.reconcile(window)
+            if drift:
+                self.stdout.write(f'  Corrected {len(drift)} numbers: {", ".join(drift[:10])}')
+            for row in board[:options['show']]:
+                self.stdout.write(f"  {row['phone_number']}  {row['reports']}")
+        self.stdout.write(self.style.SUCCESS(f'Successfully reconciled {len(windows)} leaderboards'))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.export import parse_watermark
+from api.scoring import decay_sweep, rebuild_scores, refresh_since
+
+
+class Command(BaseCommand):
+    help = 'Refreshes time-decayed spam scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Refresh numbers reported after this ISO 8601 timestamp')
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Without --since, refresh numbers reported in the last N hours; '
+                                 'corrects scores of reports written outside the API')
+        parser.add_argument('--decay-sweep', action='store_true',
+                            help='Drop scores that decayed away')
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every score from scratch (NumPy batch recompute)')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            self.stdout.write('Rebuilding all spam scores...')
+            total = rebuild_scores()
+            self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {total} spam scores'))
+            return
+
+        if options['decay_sweep']:
+            expired = decay_sweep()
+            self.stdout.write(self.style.SUCCESS(f'Decay sweep complete; dropped {expired} expired scores'))
+            return
+
+        try:
+            since = parse_watermark(options['since']) if options['since'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if since is None:
+            since = timezone.now() - timedelta(hours=options['hours'])
+
+        refreshed = refresh_since(since)
+        self.stdout.write(self.style.SUCCESS(f'Successfully refreshed {refreshed} spam scores'))
@@ -0,0 +1,93 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from api.jobs import (
+    HEARTBEAT_INTERVAL, claim_jobs, heartbeat, record_crash, requeue_stale_jobs, run_job
+)
+from api.utils import setup_worker_process
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no jobs are due instead of polling forever')
+
+    def handle(self, *args, **options):
+        self.processes = options['processes']
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+
+        self.stdout.write(f'Worker started with {self.processes} processes')
+        pool = self.create_pool()
+        in_flight = {}
+        last_heartbeat = time.monotonic()
+        try:
+            while not (self.stopping and not in_flight):
+                if time.monotonic() - last_heartbeat >= HEARTBEAT_INTERVAL.total_seconds():
+                    heartbeat(list(in_flight.values()))
+                    # Also recovers jobs of workers that died since we started
+                    requeued = requeue_stale_jobs()
+                    if requeued:
+                        self.stdout.write(f'Requeued {requeued} stale jobs')
+                    last_heartbeat = time.monotonic()
+
+                free_slots = self.processes - len(in_flight)
+                job_ids = claim_jobs(free_slots) if free_slots and not self.stopping else []
+                for job_id in job_ids:
+                    in_flight[pool.submit(run_job, job_id)] = job_id
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = in_flight.pop(future)
+                    try:
+                        self.stdout.write(f'Job {job_id} {future.result()}')
+                    except BrokenProcessPool as e:
+                        record_crash(job_id, str(e))
+                        self.stderr.write(f'Job {job_id} crashed its worker process')
+                    except Exception as e:
+                        record_crash(job_id, str(e))
+                        self.stderr.write(f'Job {job_id} errored: {str(e)}')
+
+                if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                    # Jobs still in flight were lost with the pool
+                    for job_id in in_flight.values():
+                        record_crash(job_id, 'process pool broken')
+                    in_flight.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.create_pool()
+        finally:
+            pool.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
+
+    def create_pool(self):
+        # Spawned (not forked) children, so no database connection is shared
+        # with the parent; each child sets Django up before taking jobs and
+        # ignores Ctrl-C / SIGTERM sent to the whole process group
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=setup_worker_process
+        )
+
+    def stop(self, signum, frame):
+        self.stdout.write('Stopping after in-flight jobs finish...')
+        self.stopping = True
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from django.core.validators import RegexValidator
 
 phone_regex = RegexValidator(
@@ -19,7 +20,7 @@ class User(AbstractUser):
 class Contact(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='contacts')
     name = models.CharField(max_length=255)
-    phone_number = models.CharField(validators=[phone_regex], max_length=17)
+    phone_number = models.CharField(validators=[phone_regex], max_length=17, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,11 +32,154 @@ class Contact(models.Model):
 
 class SpamReport(models.Model):
     reported_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spam_reports')
-    phone_number = models.CharField(validators=[phone_regex], max_length=17)
-    created_at = models.DateTimeField(auto_now_add=True)
+    phone_number = models.CharField(validators=[phone_regex], max_length=17, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
+        # A partitioned table (api.partitioning) can only enforce this
+        # together with created_at; SpamViewSet serializes each user's reports
         unique_together = ['reported_by', 'phone_number']
+        indexes = [
+            # A reporter's reports in order, for spam score weights (see api.scoring)
+            models.Index(fields=['reported_by', 'created_at'], name='spamreport_reporter_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Spam report for {self.phone_number}"
+
+class SpamReportRollup(models.Model):
+    """
+    Monthly per-number aggregate of spam reports that have aged out of
+    SpamReport (see api.retention).
+    """
+    phone_number = models.CharField(max_length=17, db_index=True)
+    period_start = models.DateField()
+    report_count = models.PositiveIntegerField(default=0)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        unique_together = ['phone_number', 'period_start']
+
+    def __str__(self):
+        return f"{self.report_count} spam reports for {self.phone_number} in {self.period_start:%Y-%m}"
+
+class SpamReportArchive(models.Model):
+    """
+    Reporter and number of a spam report compacted out of SpamReport, so
+    the one-report-per-user-and-number rule outlives retention.
+    """
+    reported_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    phone_number = models.CharField(max_length=17)
+    period_start = models.DateField()
+
+    class Meta:
+        unique_together = ['reported_by', 'phone_number']
+
+    def __str__(self):
+        return f"Archived spam report for {self.phone_number}"
+
+class PhoneDirectory(models.Model):
+    """
+    Materialized "who is this number" projection, one row per canonical
+    phone number. Maintained from contact, spam report and registration
+    writes (see api.directory) and rebuilt with `manage.py rebuild_directory`.
+    """
+    phone_number = models.CharField(max_length=17, unique=True)
+    registered_user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    top_name = models.CharField(max_length=255, blank=True)
+    top_name_count = models.PositiveIntegerField(default=0)
+    spam_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'phone directory'
+
+    def __str__(self):
+        return f"{self.top_name or 'Unknown'} ({self.phone_number})"
+
+class PhoneNameCount(models.Model):
+    """
+    How many users saved a number under each name, so PhoneDirectory's name
+    guess can be maintained without regrouping the number's contacts.
+    """
+    phone_number = models.CharField(max_length=17)
+    name = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['phone_number', 'name']
+        indexes = [
+            # The most common name per number (see api.directory)
+            models.Index(fields=['phone_number', '-count', 'name'], name='phonenamecount_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.phone_number}): {self.count}"
+
+class SpamScore(models.Model):
+    """
+    Precomputed time-decayed spam score per number (see api.scoring).
+    `score` is valid as of `scored_at`; reads decay it to the current time.
+    """
+    phone_number = models.CharField(max_length=17, unique=True)
+    score = models.FloatField(default=0)
+    scored_at = models.DateTimeField(default=timezone.now)
+    report_count = models.PositiveIntegerField(default=0)
+    last_report_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Spam score for {self.phone_number}: {self.score:.3f}"
+
+class Job(models.Model):
+    """
+    Background job stored in the database and executed by
+    `manage.py run_worker` (see api.jobs).
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.IntegerField(default=0)
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs (see api.jobs.heartbeat)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='job_claim_idx'),
+        ]
+        constraints = [
+            # At most one pending or running job per deduplication key
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedup_key',
+            ),
+        ]
 
     def __str__(self):
-        return f"Spam report for {self.phone_number}" 
\ No newline at end of file
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,182 @@
+"""
+Optional monthly partitioning of the spam report table on PostgreSQL.
+
+`convert_to_partitioned()` rebuilds SpamReport's table as one partitioned
+by month on created_at, and `revert_partitioning()` turns it back into the
+plain table Django creates; both run with `manage.py partition_spam_reports`.
+PostgreSQL requires the partition key in every unique constraint, so the
+partitioned table has the primary key (id, created_at) and a unique index
+on (reported_by_id, phone_number, created_at). One report per user and
+number is then upheld by SpamViewSet, which serializes each user's reports,
+rather than by the database.
+
+`ensure_partitions()` keeps upcoming months created, and compaction
+(api.retention) detaches and drops a month's partition with
+`drop_partition()` instead of deleting its rows.
+"""
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+from .models import SpamReport
+
+logger = logging.getLogger(__name__)
+
+
+def _table():
+    return SpamReport._meta.db_table
+
+
+def _columns():
+    return ', '.join(field.column for field in SpamReport._meta.concrete_fields)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def as_datetime(value):
+    return datetime(value.year, value.month, value.day, tzinfo=dt_timezone.utc)
+
+
+def _partition_name(month):
+    return f'{_table()}_p{month:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [_table()]
+        )
+        return cursor.fetchone() is not None
+
+
+def _create_partition(cursor, month):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF {_table()} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [as_datetime(month), as_datetime(next_month(month))]
+    )
+
+
+def ensure_partitions(months_ahead=3):
+    """
+    Create monthly partitions from the current month to `months_ahead`
+    months out, so new reports never land in the default partition.
+    Returns the number of months covered, 0 if the table is not partitioned.
+    """
+    if not is_partitioned():
+        return 0
+
+    month = month_start(timezone.now())
+    with connection.cursor() as cursor:
+        for _ in range(months_ahead + 1):
+            _create_partition(cursor, month)
+            month = next_month(month)
+    return months_ahead + 1
+
+
+def drop_partition(month):
+    """
+    Detach and drop a month's partition. Returns False if it has none.
+    """
+    partition = _partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [partition])
+        if cursor.fetchone()[0] is None:
+            return False
+        cursor.execute(f'ALTER TABLE {_table()} DETACH PARTITION {partition}')
+        cursor.execute(f'DROP TABLE {partition}')
+    return True
+
+
+def convert_to_partitioned(months_ahead=3):
+    """
+    Rebuild the spam report table as a partitioned table, copying existing
+    reports into monthly partitions. The table is locked for the copy.
+    Returns False if it is already partitioned.
+    """
+    if connection.vendor != 'postgresql':
+        raise NotImplementedError('Native partitioning requires PostgreSQL')
+    if is_partitioned():
+        return False
+
+    table, columns = _table(), _columns()
+    legacy = f'{table}_legacy'
+    oldest = SpamReport.objects.aggregate(oldest=Min('created_at'))['oldest'] or timezone.now()
+    last_month = month_start(timezone.now())
+    for _ in range(months_ahead):
+        last_month = next_month(last_month)
+
+    # Constraint and index names carry a _part suffix so they never collide
+    # with the names Django gives the plain table
+    with connection.schema_editor() as editor:
+        editor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        editor.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        editor.execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        )
+        editor.execute(f'CREATE SEQUENCE {table}_part_id_seq OWNED BY {table}.id')
+        editor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_part_id_seq')")
+        editor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_part_pkey PRIMARY KEY (id, created_at)')
+        editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {table}_part_reported_by_fk FOREIGN KEY (reported_by_id) '
+            f'REFERENCES {get_user_model()._meta.db_table} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        editor.execute(
+            f'CREATE UNIQUE INDEX {table}_part_reporter_number_uniq '
+            f'ON {table} (reported_by_id, phone_number, created_at)'
+        )
+        editor.execute(f'CREATE INDEX {table}_part_phone_idx ON {table} (phone_number, created_at)')
+        editor.execute(f'CREATE INDEX {table}_part_reporter_time_idx ON {table} (reported_by_id, created_at)')
+        editor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+        month = month_start(oldest)
+        with connection.cursor() as cursor:
+            while month <= last_month:
+                _create_partition(cursor, month)
+                month = next_month(month)
+
+        editor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {legacy}')
+        editor.execute(
+            f"SELECT setval('{table}_part_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        )
+        editor.execute(f'DROP TABLE {legacy}')
+
+    logger.info(f"Converted {table} to a partitioned table")
+    return True
+
+
+def revert_partitioning():
+    """
+    Turn a partitioned spam report table back into the plain table defined
+    by the model, with its unique (reported_by, phone_number) constraint.
+    Returns False if the table is not partitioned.
+    """
+    if not is_partitioned():
+        return False
+
+    table, columns = _table(), _columns()
+    partitioned = f'{table}_partitioned'
+    with connection.schema_editor() as editor:
+        editor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE')
+        editor.execute(f'ALTER TABLE {table} RENAME TO {partitioned}')
+        editor.create_model(SpamReport)
+        editor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {partitioned}')
+        editor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}",
+            [table]
+        )
+        editor.execute(f'DROP TABLE {partitioned} CASCADE')
+
+    logger.info(f"Reverted {table} to a plain table")
+    return True
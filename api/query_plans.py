@@ -0,0 +1,186 @@
+"""
+Query-plan expectations for the hot ORM queries.
+
+Each PlanCheck builds a queryset from a sample of seeded data, captures its
+plan with QuerySet.explain() and reports any violation: a sequential scan
+of the queried table, no index on it, or a row estimate above the bound.
+PostgreSQL plans are read from EXPLAIN (FORMAT JSON). SQLite's text plans
+are checked for full table scans only.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from django.db import connection
+from .models import Contact, PhoneDirectory, SpamReport, SpamReportArchive, SpamReportRollup, SpamScore
+from .utils import prefix_upper_bound
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    table: str
+    build: Callable
+    # Substring of the index name expected on PostgreSQL
+    index: Optional[str] = None
+    # Upper bound for the planner's row estimate of the whole query
+    max_rows: Optional[int] = None
+
+
+@dataclass
+class PlanResult:
+    check: PlanCheck
+    plan: str
+    violations: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return not self.violations
+
+
+HOT_QUERIES = [
+    PlanCheck(
+        name='SearchView phone lookup',
+        table=PhoneDirectory._meta.db_table,
+        build=lambda sample: PhoneDirectory.objects.select_related('registered_user').filter(
+            phone_number=sample['phone_number']
+        ),
+        index='phone_number',
+        max_rows=1,
+    ),
+    PlanCheck(
+        name='SearchView prefix range scan',
+        table=PhoneDirectory._meta.db_table,
+        build=lambda sample: PhoneDirectory.objects.filter(
+            phone_number__gte=sample['phone_number'][:7],
+            phone_number__lt=prefix_upper_bound(sample['phone_number'][:7]),
+        ).order_by('phone_number')[:20],
+        index='phone_number',
+        max_rows=20,
+    ),
+    PlanCheck(
+        name='SearchView reverse-contact lookup',
+        table=Contact._meta.db_table,
+        build=lambda sample: Contact.objects.filter(
+            phone_number__in=[sample['phone_number']]
+        ).values_list('phone_number', 'user_id'),
+        index='phone_number',
+        max_rows=500,
+    ),
+    PlanCheck(
+        name='SpamViewSet.check report count',
+        table=SpamReport._meta.db_table,
+        build=lambda sample: SpamReport.objects.filter(phone_number=sample['phone_number']),
+        index='phone_number',
+        max_rows=500,
+    ),
+    PlanCheck(
+        name='SpamViewSet.check recent reporters',
+        table=SpamReport._meta.db_table,
+        build=lambda sample: SpamReport.objects.filter(
+            phone_number=sample['phone_number']
+        ).select_related('reported_by').order_by('-created_at')[:5],
+        index='phone_number',
+        max_rows=5,
+    ),
+    PlanCheck(
+        name='SpamViewSet.check reported by you',
+        table=SpamReport._meta.db_table,
+        build=lambda sample: SpamReport.objects.filter(
+            phone_number=sample['phone_number'], reported_by_id=sample['user_id']
+        ),
+        index='reported_by',
+        max_rows=1,
+    ),
+    PlanCheck(
+        name='SpamViewSet.check compacted report count',
+        table=SpamReportRollup._meta.db_table,
+        build=lambda sample: SpamReportRollup.objects.filter(phone_number__in=[sample['phone_number']]),
+        index='phone_number',
+        max_rows=500,
+    ),
+    PlanCheck(
+        name='SpamViewSet.check reported by you (compacted)',
+        table=SpamReportArchive._meta.db_table,
+        build=lambda sample: SpamReportArchive.objects.filter(
+            phone_number=sample['phone_number'], reported_by_id=sample['user_id']
+        ),
+        index='reported_by',
+        max_rows=1,
+    ),
+    PlanCheck(
+        name='Spam score lookup',
+        table=SpamScore._meta.db_table,
+        build=lambda sample: SpamScore.objects.filter(phone_number__in=[sample['phone_number']]),
+        index='phone_number',
+        max_rows=1,
+    ),
+    PlanCheck(
+        name='ContactViewSet list',
+        table=Contact._meta.db_table,
+        build=lambda sample: Contact.objects.filter(user_id=sample['user_id']),
+        index='user',
+        max_rows=1000,
+    ),
+]
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def _check_postgresql(check, queryset):
+    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+    nodes = list(_walk(plan))
+    violations = []
+
+    # A partitioned table (see api.partitioning) is read through one scan
+    # per partition, each of which must use an index
+    relation = re.compile(rf'^{re.escape(check.table)}(_p\d{{6}}|_default)?$')
+    scans = [node for node in nodes if relation.match(node.get('Relation Name', ''))]
+    if any(node['Node Type'] == 'Seq Scan' for node in scans):
+        violations.append(f'sequential scan on {check.table}')
+
+    index_names = [node['Index Name'] for node in nodes if 'Index Name' in node]
+    if check.index and not any(check.index in name for name in index_names):
+        violations.append(
+            f"no index matching '{check.index}' used (indexes: {', '.join(index_names) or 'none'})"
+        )
+
+    max_rows = check.max_rows
+    if max_rows is not None and len(scans) > 1:
+        # The planner's estimate is at least one row per partition scanned
+        max_rows *= len(scans)
+    if max_rows is not None and plan['Plan Rows'] > max_rows:
+        violations.append(f"estimated {plan['Plan Rows']} rows, expected at most {max_rows}")
+
+    return json.dumps(plan, indent=2), violations
+
+
+def _check_sqlite(check, queryset):
+    plan = queryset.explain()
+    full_scan = re.compile(rf'\bSCAN {re.escape(check.table)}\b')
+    violations = []
+    for line in plan.splitlines():
+        # "SCAN <table>" without "USING ... INDEX" reads the whole table
+        if full_scan.search(line) and 'INDEX' not in line:
+            violations.append(f'full table scan on {check.table}')
+    return plan, violations
+
+
+def run_checks(sample, checks=HOT_QUERIES):
+    """
+    Evaluate every applicable check and return a PlanResult for each.
+    """
+    postgresql = connection.vendor == 'postgresql'
+    results = []
+    for check in checks:
+        queryset = check.build(sample)
+        if postgresql:
+            plan, violations = _check_postgresql(check, queryset)
+        else:
+            plan, violations = _check_sqlite(check, queryset)
+        results.append(PlanResult(check=check, plan=plan, violations=violations))
+    return results
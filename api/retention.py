@@ -0,0 +1,134 @@
+"""
+Retention for SpamReport.
+
+`compact()` rolls whole months older than the retention window up into
+per-number SpamReportRollup rows and removes their raw reports. On a
+partitioned table (see api.partitioning) the month's partition is detached
+and dropped; otherwise, and for stray rows in the default partition, the
+rows are deleted in batches. Each compacted report's reporter and number
+are kept in SpamReportArchive, so a user still cannot report the same
+number twice and reporter weights keep counting the reports (see
+api.scoring).
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from .models import SpamReport, SpamReportArchive, SpamReportRollup
+from .partitioning import as_datetime, drop_partition, is_partitioned, month_start, next_month
+from .scoring import refresh_numbers
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+SCORE_BATCH_SIZE = 1000
+
+
+def has_reported(user_id, phone_number):
+    """
+    Whether the user reported the number, raw or compacted. Raw reports are
+    checked first: compaction archives and deletes a report in one
+    transaction, so one missing from the first query shows up in the second.
+    """
+    return (
+        SpamReport.objects.filter(reported_by_id=user_id, phone_number=phone_number).exists()
+        or SpamReportArchive.objects.filter(reported_by_id=user_id, phone_number=phone_number).exists()
+    )
+
+
+def _month_reports(start, end):
+    return SpamReport.objects.filter(created_at__gte=as_datetime(start), created_at__lt=as_datetime(end))
+
+
+def _roll_up(start, end):
+    """
+    Add the reports in [start, end) to that month's rollup rows. Returns
+    the numbers rolled up.
+    """
+    rows = (
+        _month_reports(start, end)
+        .values('phone_number')
+        .annotate(report_count=Count('id'), first_seen=Min('created_at'), last_seen=Max('created_at'))
+    )
+    existing = {
+        rollup.phone_number: rollup
+        for rollup in SpamReportRollup.objects.filter(period_start=start)
+    }
+
+    new_rollups, updated_rollups = [], []
+    for row in rows.iterator():
+        rollup = existing.get(row['phone_number'])
+        if rollup is None:
+            new_rollups.append(SpamReportRollup(period_start=start, **row))
+            continue
+        rollup.report_count += row['report_count']
+        rollup.first_seen = min(rollup.first_seen, row['first_seen'])
+        rollup.last_seen = max(rollup.last_seen, row['last_seen'])
+        updated_rollups.append(rollup)
+
+    SpamReportRollup.objects.bulk_create(new_rollups, batch_size=BATCH_SIZE)
+    SpamReportRollup.objects.bulk_update(
+        updated_rollups, ['report_count', 'first_seen', 'last_seen'], batch_size=BATCH_SIZE
+    )
+    return {rollup.phone_number for rollup in [*new_rollups, *updated_rollups]}
+
+
+def _archive(start, end):
+    reports = _month_reports(start, end).values_list('reported_by_id', 'phone_number')
+    batch = []
+    for reporter_id, phone_number in reports.iterator(chunk_size=BATCH_SIZE):
+        batch.append(SpamReportArchive(reported_by_id=reporter_id, phone_number=phone_number, period_start=start))
+        if len(batch) >= BATCH_SIZE:
+            SpamReportArchive.objects.bulk_create(batch)
+            batch = []
+    SpamReportArchive.objects.bulk_create(batch)
+
+
+def _remove(start, end, partitioned):
+    if partitioned:
+        drop_partition(start)
+
+    reports = _month_reports(start, end)
+    while True:
+        batch = list(reports.values_list('id', flat=True)[:BATCH_SIZE])
+        if not batch:
+            break
+        reports.filter(id__in=batch).delete()
+
+
+def compact(retention_days=None):
+    """
+    Roll whole months older than the retention window into
+    SpamReportRollup and remove their raw reports. Returns the months compacted.
+    """
+    if retention_days is None:
+        retention_days = settings.SPAM_REPORT_RETENTION_DAYS
+
+    # Only whole months are compacted, so a month is always either raw or rolled up
+    cutoff = month_start(timezone.now() - timedelta(days=retention_days))
+    oldest = SpamReport.objects.aggregate(oldest=Min('created_at'))['oldest']
+    if oldest is None or month_start(oldest) >= cutoff:
+        return []
+
+    partitioned = is_partitioned()
+    compacted = []
+    month = month_start(oldest)
+    while month < cutoff:
+        end = next_month(month)
+        # Rollup, archive and removal commit together, so readers see each
+        # report either raw or compacted, never both or neither
+        with transaction.atomic():
+            phone_numbers = _roll_up(month, end)
+            _archive(month, end)
+            _remove(month, end, partitioned)
+        # Scores only cover raw reports
+        phone_numbers = sorted(phone_numbers)
+        for start in range(0, len(phone_numbers), SCORE_BATCH_SIZE):
+            refresh_numbers(phone_numbers[start:start + SCORE_BATCH_SIZE])
+        logger.info(f"Compacted spam reports for {month:%Y-%m} for {len(phone_numbers)} numbers")
+        compacted.append(month)
+        month = end
+
+    return compacted
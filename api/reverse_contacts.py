@@ -0,0 +1,55 @@
+from .models import Contact
+from .utils import normalize_phone_number, shared_cache
+
+# Reverse-contact index: phone number -> ids of the users who saved it.
+# Entries live in the shared cache, are filled from the indexed
+# Contact.phone_number column on a miss and are invalidated on contact writes.
+# The timeout bounds how long a fill that raced an invalidation can stay stale.
+CACHE_PREFIX = 'reverse_contacts'
+CACHE_TIMEOUT = 10 * 60
+
+
+def _key(phone_number):
+    return f'{CACHE_PREFIX}:{phone_number}'
+
+
+def get_savers_many(phone_numbers):
+    """
+    Return a dict mapping each phone number to the frozenset of user ids
+    that have it saved. Cache misses are resolved with a single query.
+    """
+    phone_numbers = {normalize_phone_number(number) for number in phone_numbers}
+    phone_numbers.discard('')
+    if not phone_numbers:
+        return {}
+
+    keys = {_key(number): number for number in phone_numbers}
+    cached = shared_cache().get_many(keys.keys())
+    savers = {keys[key]: value for key, value in cached.items()}
+
+    missing = phone_numbers - savers.keys()
+    if missing:
+        loaded = {number: set() for number in missing}
+        rows = Contact.objects.filter(phone_number__in=missing).values_list('phone_number', 'user_id')
+        for phone_number, user_id in rows:
+            loaded[phone_number].add(user_id)
+        loaded = {number: frozenset(user_ids) for number, user_ids in loaded.items()}
+        shared_cache().set_many({_key(number): user_ids for number, user_ids in loaded.items()}, CACHE_TIMEOUT)
+        savers.update(loaded)
+
+    return savers
+
+
+def get_savers(phone_number):
+    """
+    Return the frozenset of user ids that have this phone number saved.
+    """
+    phone_number = normalize_phone_number(phone_number)
+    return get_savers_many([phone_number]).get(phone_number, frozenset())
+
+
+def invalidate(*phone_numbers):
+    """
+    Drop index entries after contacts for these numbers were written.
+    """
+    shared_cache().delete_many([_key(normalize_phone_number(number)) for number in phone_numbers])
@@ -0,0 +1,317 @@
+"""
+Time-decayed, reporter-weighted spam scoring.
+
+A number's score is the sum over its reports of
+
+    reporter_weight * 0.5 ** (age / half_life)
+
+where reporter_weight = 1 / (1 + ln(n)) and n is the number of reports
+the reporter had filed up to and including this one (ordered by
+created_at, then id, after any of their reports compacted away by
+api.retention), so accounts that report everything count for less and a
+report's weight never changes after it is made. Every path (the
+incremental one, per-number refreshes and the full rebuild) uses this same
+definition. Only retained raw reports are scored; compacted ones have
+decayed away by then but still count in `report_count` and
+`last_report_at`. Because every term decays
+at the same rate, a stored score stays exact when multiplied by the decay
+since its `scored_at`; reads are therefore a single row lookup and new
+reports are folded in incrementally. The likelihood shown to clients is
+100 * (1 - exp(-score / saturation)).
+"""
+import logging
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+from .models import SpamReport, SpamReportArchive, SpamReportRollup, SpamScore
+from .utils import normalize_phone_number
+
+logger = logging.getLogger(__name__)
+
+# Scores decayed below this are dropped by the sweep
+MIN_SCORE = 1e-3
+
+
+def half_life_seconds():
+    return settings.SPAM_SCORE_HALF_LIFE_DAYS * 24 * 60 * 60
+
+
+def decay(seconds):
+    return 0.5 ** (max(seconds, 0) / half_life_seconds())
+
+
+def reporter_weight(reports_filed):
+    return 1 / (1 + math.log(max(reports_filed, 1)))
+
+
+def likelihood(score):
+    return 100 * (1 - math.exp(-score / settings.SPAM_SCORE_SATURATION))
+
+
+def current_score(entry, now=None):
+    now = now or timezone.now()
+    return entry.score * decay((now - entry.scored_at).total_seconds())
+
+
+def get_likelihoods(phone_numbers):
+    """
+    Spam likelihood (percent) for each number, in one query. Keyed by the
+    numbers as given, which may be stored without their leading '+'.
+    """
+    now = timezone.now()
+    normalized = {number: normalize_phone_number(number) for number in phone_numbers}
+    likelihoods = dict.fromkeys(normalized.values(), 0)
+    for entry in SpamScore.objects.filter(phone_number__in=likelihoods):
+        likelihoods[entry.phone_number] = likelihood(current_score(entry, now))
+    return {number: likelihoods[canonical] for number, canonical in normalized.items()}
+
+
+def get_likelihood(phone_number):
+    return get_likelihoods([phone_number])[phone_number]
+
+
+def _filed_up_to(reporter_id, created_at, report_id):
+    """
+    Filter for a reporter's reports up to and including the given one.
+    """
+    return Q(reported_by_id=reporter_id) & (
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=report_id)
+    )
+
+
+def _archived_counts(reporter_ids):
+    """
+    Number of compacted reports per reporter, for those that have any.
+    """
+    return dict(
+        SpamReportArchive.objects.filter(reported_by_id__in=reporter_ids)
+        .values('reported_by_id')
+        .annotate(reports=Count('id'))
+        .values_list('reported_by_id', 'reports')
+    )
+
+
+def _rolled_up(phone_numbers=None):
+    """
+    (report count, last seen) of compacted reports per number, for those
+    that have any; all numbers if `phone_numbers` is None.
+    """
+    rollups = SpamReportRollup.objects.all()
+    if phone_numbers is not None:
+        rollups = rollups.filter(phone_number__in=phone_numbers)
+    return {
+        row['phone_number']: (row['reports'], row['last_seen'])
+        for row in rollups.values('phone_number').annotate(reports=Sum('report_count'), last_seen=Max('last_seen'))
+    }
+
+
+def record_report(report):
+    """
+    Fold a new report into its number's score without touching other reports.
+    """
+    filed = SpamReport.objects.filter(
+        _filed_up_to(report.reported_by_id, report.created_at, report.id)
+    ).count()
+    filed += _archived_counts([report.reported_by_id]).get(report.reported_by_id, 0)
+    weight = reporter_weight(filed)
+    now = timezone.now()
+
+    with transaction.atomic():
+        entry, created = SpamScore.objects.select_for_update().get_or_create(
+            phone_number=report.phone_number,
+            defaults={'score': weight, 'scored_at': now, 'report_count': 1,
+                      'last_report_at': report.created_at}
+        )
+        if created:
+            rolled_up_count, _ = _rolled_up([report.phone_number]).get(report.phone_number, (0, None))
+            if rolled_up_count:
+                entry.report_count += rolled_up_count
+                entry.save(update_fields=['report_count'])
+        else:
+            entry.score = current_score(entry, now) + weight
+            entry.scored_at = now
+            entry.report_count += 1
+            entry.last_report_at = report.created_at
+            entry.save(update_fields=['score', 'scored_at', 'report_count', 'last_report_at'])
+    return entry
+
+
+def refresh_numbers(phone_numbers):
+    """
+    Recompute scores exactly for the given numbers from their reports.
+    """
+    phone_numbers = set(phone_numbers)
+    if not phone_numbers:
+        return 0
+
+    filed = (
+        SpamReport.objects.filter(
+            _filed_up_to(OuterRef('reported_by_id'), OuterRef('created_at'), OuterRef('id'))
+        )
+        .order_by()
+        .values('reported_by_id')
+        .annotate(filed=Count('id'))
+        .values('filed')
+    )
+    reports = list(
+        SpamReport.objects.filter(phone_number__in=phone_numbers)
+        .annotate(filed=Subquery(filed))
+        .values_list('phone_number', 'reported_by_id', 'filed', 'created_at')
+    )
+    archived = _archived_counts({reporter_id for _, reporter_id, _, _ in reports})
+
+    now = timezone.now()
+    entries = {
+        number: SpamScore(phone_number=number, score=0, scored_at=now, report_count=0)
+        for number in phone_numbers
+    }
+    for phone_number, (rolled_up_count, last_seen) in _rolled_up(phone_numbers).items():
+        entries[phone_number].report_count = rolled_up_count
+        entries[phone_number].last_report_at = last_seen
+    scored = set()
+    for phone_number, reporter_id, filed, created_at in reports:
+        entry = entries[phone_number]
+        filed += archived.get(reporter_id, 0)
+        entry.score += reporter_weight(filed) * decay((now - created_at).total_seconds())
+        entry.report_count += 1
+        if entry.last_report_at is None or created_at > entry.last_report_at:
+            entry.last_report_at = created_at
+        scored.add(phone_number)
+
+    with transaction.atomic():
+        SpamScore.objects.filter(phone_number__in=phone_numbers).delete()
+        SpamScore.objects.bulk_create(entries[number] for number in scored)
+    return len(entries)
+
+
+def refresh_since(watermark, batch_size=1000):
+    """
+    Recompute only the numbers that received reports after `watermark`.
+    """
+    phone_numbers = (
+        SpamReport.objects.filter(created_at__gt=watermark)
+        .values_list('phone_number', flat=True)
+        .distinct()
+        .order_by('phone_number')
+    )
+    batch, refreshed = [], 0
+    for phone_number in phone_numbers.iterator(chunk_size=batch_size):
+        batch.append(phone_number)
+        if len(batch) >= batch_size:
+            refreshed += refresh_numbers(batch)
+            batch = []
+    refreshed += refresh_numbers(batch)
+    return refreshed
+
+
+def refresh_after_removal(phone_number, reporter_id, created_at):
+    """
+    Recompute scores after a report was deleted: its number's, and those of
+    the reporter's later reports, whose position (and weight) it shifted.
+    """
+    later = SpamReport.objects.filter(
+        reported_by_id=reporter_id, created_at__gte=created_at
+    ).values_list('phone_number', flat=True)
+    return refresh_numbers({phone_number, *later})
+
+
+def decay_sweep(batch_size=1000):
+    """
+    Drop scores that decayed below MIN_SCORE, keeping the score table
+    limited to numbers that still matter. Reads decay stored scores
+    themselves, so nothing else is rewritten. Each batch is locked while it
+    is checked, so a report folded in concurrently (record_report locks the
+    same row) is never deleted along with the stale score.
+    """
+    ids = SpamScore.objects.order_by('id').values_list('id', flat=True)
+    last_id, expired = 0, 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1]
+
+        now = timezone.now()
+        with transaction.atomic():
+            stale = [
+                entry.id
+                for entry in SpamScore.objects.select_for_update().filter(id__in=batch)
+                if current_score(entry, now) < MIN_SCORE
+            ]
+            SpamScore.objects.filter(id__in=stale).delete()
+        expired += len(stale)
+    return expired
+
+
+def rebuild_scores(batch_size=10000):
+    """
+    Recompute every score from scratch with vectorized NumPy operations.
+    Returns the number of scored phone numbers.
+    """
+    # Imported here so web workers that never rebuild do not load NumPy
+    import numpy as np
+
+    rows = SpamReport.objects.values_list('id', 'phone_number', 'reported_by_id', 'created_at')
+    report_ids, phone_numbers, reporter_ids, timestamps = [], [], [], []
+    for report_id, phone_number, reporter_id, created_at in rows.iterator(chunk_size=batch_size):
+        report_ids.append(report_id)
+        phone_numbers.append(phone_number)
+        reporter_ids.append(reporter_id)
+        timestamps.append(created_at.timestamp())
+
+    now = timezone.now()
+    if not phone_numbers:
+        SpamScore.objects.all().delete()
+        return 0
+
+    report_ids = np.asarray(report_ids, dtype=np.int64)
+    reporter_ids = np.asarray(reporter_ids, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    # Position of each report among its reporter's reports, by (created_at, id)
+    order = np.lexsort((report_ids, timestamps, reporter_ids))
+    sorted_reporters = reporter_ids[order]
+    group_starts = np.flatnonzero(np.r_[True, sorted_reporters[1:] != sorted_reporters[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(order)])
+    filed = np.empty(len(order), dtype=np.int64)
+    filed[order] = np.arange(len(order)) - np.repeat(group_starts, group_sizes) + 1
+    # Plus the reporter's compacted reports, which all precede their raw ones
+    reporters, reporter_index = np.unique(reporter_ids, return_inverse=True)
+    archived = _archived_counts(reporters.tolist())
+    filed += np.asarray([archived.get(reporter, 0) for reporter in reporters.tolist()], dtype=np.int64)[reporter_index]
+    weights = 1 / (1 + np.log(filed))
+    ages = np.maximum(now.timestamp() - timestamps, 0)
+    contributions = weights * np.power(0.5, ages / half_life_seconds())
+
+    numbers, number_index = np.unique(np.asarray(phone_numbers, dtype=object), return_inverse=True)
+    scores = np.bincount(number_index, weights=contributions, minlength=len(numbers))
+    report_counts = np.bincount(number_index, minlength=len(numbers))
+    last_reports = np.full(len(numbers), -np.inf)
+    np.maximum.at(last_reports, number_index, timestamps)
+    rolled_up = _rolled_up()
+    for i, number in enumerate(numbers):
+        if number in rolled_up:
+            rolled_up_count, last_seen = rolled_up[number]
+            report_counts[i] += rolled_up_count
+            last_reports[i] = max(last_reports[i], last_seen.timestamp())
+
+    entries = [
+        SpamScore(
+            phone_number=number,
+            score=float(score),
+            scored_at=now,
+            report_count=int(count),
+            last_report_at=datetime.fromtimestamp(last_report, tz=dt_timezone.utc),
+        )
+        for number, score, count, last_report in zip(numbers, scores, report_counts, last_reports)
+    ]
+
+    with transaction.atomic():
+        SpamScore.objects.all().delete()
+        SpamScore.objects.bulk_create(entries, batch_size=batch_size)
+
+    logger.info(f"Rebuilt spam scores for {len(entries)} numbers from {len(phone_numbers)} reports")
+    return len(entries)
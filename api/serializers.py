@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.db.models import Count
-from .models import User, Contact, SpamReport
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from .models import User, Contact, SpamReport, Job, phone_regex
+from .hashers import hash_password
+from .scoring import get_likelihood
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,6 +16,10 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
+    # Declared explicitly to drop the UniqueValidators a ModelSerializer adds;
+    # uniqueness is enforced by the insert itself (see RegistrationView)
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    phone_number = serializers.CharField(max_length=17, validators=[phone_regex])
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -25,7 +32,15 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        # Equivalent to create_user, with the hash computed on the bounded
+        # hashing pool and a single INSERT
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            phone_number=validated_data['phone_number'],
+            email=User.objects.normalize_email(validated_data.get('email')),
+            password=hash_password(validated_data['password'])
+        )
+        user.save(force_insert=True)
         return user
 
 class ContactSerializer(serializers.ModelSerializer):
@@ -36,11 +51,7 @@ class ContactSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'phone_number', 'spam_likelihood')
 
     def get_spam_likelihood(self, obj):
-        total_users = User.objects.count()
-        spam_count = SpamReport.objects.filter(phone_number=obj.phone_number).count()
-        if total_users == 0:
-            return 0
-        return (spam_count / total_users) * 100
+        return get_likelihood(obj.phone_number)
 
 class SearchResultSerializer(serializers.ModelSerializer):
     name = serializers.CharField()
@@ -56,4 +67,18 @@ class SpamReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = SpamReport
         fields = ('id', 'phone_number', 'created_at')
-        read_only_fields = ('created_at',) 
\ No newline at end of file
+        read_only_fields = ('created_at',)
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'result',
+                  'last_error', 'created_at', 'started_at', 'finished_at')
+        read_only_fields = fields
+
+class ContactImportSerializer(serializers.Serializer):
+    contacts = serializers.ListField(
+        child=serializers.DictField(child=serializers.CharField(allow_blank=True)),
+        allow_empty=False,
+        max_length=100000
+    )
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from collections import Counter
+from .utils import shared_cache, shared_cache_is_database
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _count(metric):
+    with _metrics_lock:
+        _metrics[metric] += 1
+
+
+def metrics():
+    """
+    Snapshot of the coalescing counters for this process.
+    """
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations of the same key.
+
+    Within a process, callers that miss while a computation for the key is
+    in flight wait for it and share its result. Across processes, a short
+    lock in the shared cache elects one leader, which publishes its result
+    under a short-lived key that the other workers poll for. Waiters that
+    time out fall back to computing the value themselves.
+
+    The cross-worker tier is skipped on the database cache backend, where
+    the lock and polling cost as many round trips as the lookups being
+    coalesced; pass `shared` to override.
+    """
+
+    def __init__(self, namespace, wait_timeout=2.0, lock_timeout=5, result_ttl=1,
+                 poll_interval=0.01, shared=None):
+        self.namespace = namespace
+        self._shared = shared
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                _count(f'{self.namespace}.coalesced_local')
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            _count(f'{self.namespace}.timeouts')
+            return fn()
+
+        try:
+            if self.shared:
+                call.result = self._do_shared(key, fn)
+            else:
+                _count(f'{self.namespace}.computed')
+                call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @property
+    def shared(self):
+        if self._shared is None:
+            self._shared = not shared_cache_is_database()
+        return self._shared
+
+    def _do_shared(self, key, fn):
+        cache = shared_cache()
+        lock_key = f'single_flight:{self.namespace}:{key}:lock'
+        result_key = f'single_flight:{self.namespace}:{key}:result'
+
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            _count(f'{self.namespace}.coalesced_shared')
+            return result
+
+        if cache.add(lock_key, 1, self.lock_timeout):
+            _count(f'{self.namespace}.computed')
+            try:
+                result = fn()
+                cache.set(result_key, result, self.result_ttl)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker holds the lock; wait for it to publish
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                _count(f'{self.namespace}.coalesced_shared')
+                return result
+            if cache.get(lock_key) is None:
+                # Leader failed without publishing
+                break
+
+        _count(f'{self.namespace}.timeouts')
+        logger.warning(f"Single-flight wait for {self.namespace}:{key} gave up, computing locally")
+        return fn()
@@ -0,0 +1,253 @@
+"""
+Compact binary spam-list snapshots for offline and edge consumers.
+
+A snapshot is a fixed-width, sorted file that can be memory-mapped and
+binary-searched:
+
+    header   32 bytes   magic, version, record count, created_at, threshold
+    records  10 bytes   uint64 phone key, uint16 score (likelihood * 100)
+
+The phone key is the E.164 number without its '+' read as an integer.
+All integers are little-endian. Each build also writes a delta file
+against the previous version:
+
+    header   32 bytes   magic, from version, to version, upsert count, removal count
+    upserts  10 bytes   records that are new or whose score changed
+    removals  8 bytes   uint64 keys no longer listed
+"""
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from .export import spam_aggregates
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'SPMSNAP1'
+DELTA_MAGIC = b'SPMDELT1'
+SNAPSHOT_HEADER = struct.Struct('<8sIIQH6x')
+DELTA_HEADER = struct.Struct('<8sIIII8x')
+RECORD = struct.Struct('<QH')
+KEY = struct.Struct('<Q')
+
+SCORE_SCALE = 100
+SNAPSHOT_NAME = re.compile(r'^spamlist-(\d{8})\.bin$')
+
+# How often the in-process reader looks for a newer snapshot on disk
+RELOAD_INTERVAL = 60
+
+
+def snapshot_dir():
+    return str(settings.SPAM_SNAPSHOT_DIR)
+
+
+def snapshot_path(version):
+    return os.path.join(snapshot_dir(), f'spamlist-{version:08d}.bin')
+
+
+def delta_path(from_version, to_version):
+    return os.path.join(snapshot_dir(), f'spamlist-{from_version:08d}-{to_version:08d}.delta')
+
+
+def phone_key(phone_number):
+    """
+    Integer key for a phone number, or None if it cannot be keyed
+    losslessly (digits starting with 0 are not valid E.164).
+    """
+    digits = phone_number.lstrip('+')
+    if not digits.isdigit() or digits.startswith('0'):
+        return None
+    return int(digits)
+
+
+def quantize(likelihood):
+    return max(0, min(int(round(likelihood * SCORE_SCALE)), 100 * SCORE_SCALE))
+
+
+def list_versions():
+    try:
+        names = os.listdir(snapshot_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(int(match.group(1)) for match in map(SNAPSHOT_NAME.match, names) if match)
+
+
+class SpamSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.version, self.record_count, created_at, threshold = (
+            SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        )
+        if magic != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a spam snapshot")
+        expected_size = SNAPSHOT_HEADER.size + self.record_count * RECORD.size
+        if len(self._mmap) != expected_size:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+        self.created_at = created_at
+        self.threshold = threshold / SCORE_SCALE
+
+    def __len__(self):
+        return self.record_count
+
+    def __iter__(self):
+        for index in range(self.record_count):
+            yield self.record(index)
+
+    def record(self, index):
+        return RECORD.unpack_from(self._mmap, SNAPSHOT_HEADER.size + index * RECORD.size)
+
+    def lookup(self, phone_number):
+        """
+        Binary search for a number; returns its likelihood or None if unlisted.
+        """
+        key = phone_key(phone_number)
+        if key is None:
+            return None
+
+        low, high = 0, self.record_count
+        while low < high:
+            middle = (low + high) // 2
+            middle_key, score = self.record(middle)
+            if middle_key == key:
+                return score / SCORE_SCALE
+            if middle_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self):
+        self._mmap.close()
+
+
+def _write_atomic(path, chunks):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _diff(previous, current):
+    """
+    Merge-join two sorted record sequences into (upserts, removed keys).
+    """
+    upserts, removals = [], []
+    previous, current = iter(previous), iter(current)
+    old, new = next(previous, None), next(current, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            removals.append(old[0])
+            old = next(previous, None)
+        elif old is None or new[0] < old[0]:
+            upserts.append(new)
+            new = next(current, None)
+        else:
+            if old[1] != new[1]:
+                upserts.append(new)
+            old, new = next(previous, None), next(current, None)
+    return upserts, removals
+
+
+def build_snapshot(threshold=None, min_reporters=None):
+    """
+    Write the next snapshot version (and a delta from the previous one).
+    Numbers are listed at `threshold` likelihood or above, and only once
+    `min_reporters` users reported them. Returns the new version number.
+    """
+    if threshold is None:
+        threshold = settings.SPAM_SNAPSHOT_THRESHOLD
+    if min_reporters is None:
+        min_reporters = settings.SPAM_SNAPSHOT_MIN_REPORTERS
+
+    records = []
+    for row in spam_aggregates():
+        # A user reports a number at most once, so reports are reporters
+        if row['spam_likelihood'] < threshold or row['report_count'] < min_reporters:
+            continue
+        key = phone_key(row['phone_number'])
+        if key is not None:
+            records.append((key, quantize(row['spam_likelihood'])))
+    records.sort()
+
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    versions = list_versions()
+    previous_version = versions[-1] if versions else None
+    version = (previous_version or 0) + 1
+
+    header = SNAPSHOT_HEADER.pack(
+        SNAPSHOT_MAGIC, version, len(records), int(timezone.now().timestamp()), quantize(threshold)
+    )
+    _write_atomic(snapshot_path(version), [header] + [RECORD.pack(*record) for record in records])
+
+    if previous_version is not None:
+        previous = SpamSnapshot(snapshot_path(previous_version))
+        try:
+            upserts, removals = _diff(previous, records)
+        finally:
+            previous.close()
+        header = DELTA_HEADER.pack(DELTA_MAGIC, previous_version, version, len(upserts), len(removals))
+        _write_atomic(
+            delta_path(previous_version, version),
+            [header]
+            + [RECORD.pack(*record) for record in upserts]
+            + [KEY.pack(key) for key in removals]
+        )
+
+    logger.info(f"Built spam snapshot v{version} with {len(records)} numbers")
+    return version
+
+
+def prune_snapshots(keep):
+    """
+    Remove all but the newest `keep` snapshots and the deltas starting from them.
+    """
+    versions = list_versions()
+    for version in versions[:-keep] if keep > 0 else []:
+        for path in (snapshot_path(version), delta_path(version, version + 1)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+_latest = None
+_latest_checked_at = float('-inf')
+_latest_lock = threading.Lock()
+
+
+def get_latest_snapshot():
+    """
+    Return the newest snapshot mapped into this process, or None if none
+    has been built. New versions are picked up every RELOAD_INTERVAL seconds.
+    """
+    global _latest, _latest_checked_at
+
+    if time.monotonic() - _latest_checked_at < RELOAD_INTERVAL:
+        return _latest
+
+    with _latest_lock:
+        if time.monotonic() - _latest_checked_at >= RELOAD_INTERVAL:
+            versions = list_versions()
+            if versions and (_latest is None or _latest.version != versions[-1]):
+                try:
+                    # The previous mapping is left for the garbage collector,
+                    # as other threads may still be reading from it
+                    _latest = SpamSnapshot(snapshot_path(versions[-1]))
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load spam snapshot: {str(e)}")
+            _latest_checked_at = time.monotonic()
+    return _latest
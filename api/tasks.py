@@ -0,0 +1,107 @@
+"""
+Background tasks runnable through the job queue (see api.jobs).
+
+Each task takes the job payload as keyword arguments and returns a
+JSON-serializable result.
+"""
+import logging
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from .directory import add_contact_name, rebuild_directory
+from .models import Contact, phone_regex
+from .partitioning import ensure_partitions
+from .retention import compact
+from .scoring import decay_sweep, rebuild_scores
+from .snapshots import build_snapshot
+from .utils import normalize_phone_number
+from . import leaderboard, reverse_contacts
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def rebuild_directory_task(batch_size=1000):
+    return {'entries': rebuild_directory(batch_size=batch_size)}
+
+
+def build_spam_snapshot_task(threshold=None, min_reporters=None):
+    return {'version': build_snapshot(threshold=threshold, min_reporters=min_reporters)}
+
+
+def rebuild_spam_scores_task():
+    return {'scores': rebuild_scores()}
+
+
+def spam_score_decay_sweep_task():
+    return {'expired': decay_sweep()}
+
+
+def compact_spam_reports_task(retention_days=None):
+    return {'compacted_months': [f'{month:%Y-%m}' for month in compact(retention_days=retention_days)]}
+
+
+def ensure_spam_partitions_task(months_ahead=3):
+    return {'months': ensure_partitions(months_ahead=months_ahead)}
+
+
+def reconcile_leaderboard_task(window=None):
+    windows = [window] if window else list(leaderboard.WINDOWS)
+    return {name: len(leaderboard.reconcile(name)[1]) for name in windows}
+
+
+def import_contacts_task(user_id, contacts, batch_size=1000):
+    """
+    Bulk-create contacts for a user, skipping invalid entries and numbers
+    the user already has saved.
+    """
+    user = User.objects.get(pk=user_id)
+    existing = set(Contact.objects.filter(user=user).values_list('phone_number', flat=True))
+
+    new_contacts = {}
+    invalid = 0
+    for entry in contacts:
+        name = str(entry.get('name', '')).strip()[:255]
+        phone_number = normalize_phone_number(str(entry.get('phone_number', '')))
+        try:
+            phone_regex(phone_number)
+        except ValidationError:
+            invalid += 1
+            continue
+        if not name:
+            invalid += 1
+            continue
+        if phone_number in existing or phone_number in new_contacts:
+            continue
+        new_contacts[phone_number] = Contact(user=user, name=name, phone_number=phone_number)
+
+    Contact.objects.bulk_create(new_contacts.values(), batch_size=batch_size, ignore_conflicts=True)
+
+    for phone_number, contact in new_contacts.items():
+        add_contact_name(phone_number, contact.name)
+    reverse_contacts.invalidate(*new_contacts)
+
+    logger.info(f"Imported {len(new_contacts)} contacts for user {user.username}")
+    return {
+        'created': len(new_contacts),
+        'skipped': len(contacts) - len(new_contacts) - invalid,
+        'invalid': invalid,
+    }
+
+
+TASKS = {
+    'rebuild_directory': rebuild_directory_task,
+    'build_spam_snapshot': build_spam_snapshot_task,
+    'import_contacts': import_contacts_task,
+    'rebuild_spam_scores': rebuild_spam_scores_task,
+    'spam_score_decay_sweep': spam_score_decay_sweep_task,
+    'compact_spam_reports': compact_spam_reports_task,
+    'ensure_spam_partitions': ensure_spam_partitions_task,
+    'reconcile_leaderboard': reconcile_leaderboard_task,
+}
+
+# Tasks admins may enqueue directly through the jobs endpoint
+MAINTENANCE_TASKS = (
+    'rebuild_directory', 'build_spam_snapshot', 'rebuild_spam_scores', 'spam_score_decay_sweep',
+    'compact_spam_reports', 'ensure_spam_partitions', 'reconcile_leaderboard'
+)
@@ -10,6 +10,7 @@ from .views import (
     ContactViewSet,
     SearchView,
     SpamViewSet,
+    JobViewSet,
     health_check
 )
 
@@ -17,6 +18,7 @@ from .views import (
 router = DefaultRouter()
 router.register(r'contacts', ContactViewSet, basename='contact')
 router.register(r'spam', SpamViewSet, basename='spam')
+router.register(r'jobs', JobViewSet, basename='job')
 
 # Auth URLs
 auth_urls = [
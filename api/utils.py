@@ -0,0 +1,61 @@
+import signal
+import django
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+
+
+def normalize_phone_number(phone_number):
+    """
+    Return the canonical form of a phone number as stored by the API
+    (surrounding whitespace stripped, leading '+' enforced).
+    """
+    phone_number = (phone_number or '').strip()
+    if phone_number and not phone_number.startswith('+'):
+        phone_number = '+' + phone_number
+    return phone_number
+
+
+def shared_cache():
+    """
+    The cache shared by every web and worker process (see CACHES).
+    """
+    return caches['shared']
+
+
+def shared_cache_is_database():
+    """
+    Whether the shared cache is the database fallback rather than Redis.
+    """
+    return isinstance(caches['shared'], DatabaseCache)
+
+
+def stored_forms(phone_number):
+    """
+    Spellings under which a canonical number can be stored. Contacts and
+    users keep the number as submitted, with or without the leading '+'.
+    """
+    return [phone_number, phone_number[1:]]
+
+
+def prefix_upper_bound(prefix):
+    """
+    Smallest string above every number that starts with `prefix` (a '+'
+    followed by digits), or None if there is none. A prefix search is then a
+    plain range on the phone number's btree index, which, unlike LIKE,
+    keeps index order under any collation.
+    """
+    head = prefix.rstrip('9')
+    if not head[-1:].isdigit():
+        return None
+    return head[:-1] + str(int(head[-1]) + 1)
+
+
+def setup_worker_process():
+    """
+    Initializer for job worker child processes: set Django up and leave
+    SIGINT/SIGTERM to the parent, which stops once in-flight jobs finish.
+    Kept here because this module is importable before Django is set up.
+    """
+    django.setup()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
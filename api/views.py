@@ -1,18 +1,37 @@
+import hashlib
+import json
 import logging
-from rest_framework import viewsets, status, filters
+import re
+from rest_framework import exceptions, viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.views import APIView
-from django.db.models import Q, Count, F
+from django.db.models import Q, Count, F, Sum
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError, connections
+from django.db import IntegrityError, connections, transaction
 from django.db.utils import OperationalError
-from .models import Contact, SpamReport
+from django.http import FileResponse, StreamingHttpResponse
+from .models import Contact, SpamReport, PhoneDirectory, Job
+from .directory import (
+    add_contact_name, build_entry, count_reports, record_registration, record_spam_report, refresh_spam_count,
+    remove_contact_name
+)
+from .utils import normalize_phone_number, prefix_upper_bound
+from . import reverse_contacts
+from .export import EXPORT_FORMATS, next_watermark, parse_watermark, render_export, spam_aggregates
+from . import snapshots
+from . import single_flight
+from . import jobs
+from . import scoring
+from . import leaderboard
+from .retention import has_reported
+from .tasks import MAINTENANCE_TASKS
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, ContactSerializer,
-    SearchResultSerializer, SpamReportSerializer
+    SearchResultSerializer, SpamReportSerializer, JobSerializer, ContactImportSerializer
 )
 from rest_framework.parsers import JSONParser
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -21,14 +40,16 @@ logger = logging.getLogger(__name__)
 
 User = get_user_model()
 
+# Coalesce concurrent lookups of the same (hot) number
+directory_flight = single_flight.SingleFlight('directory')
+spam_stats_flight = single_flight.SingleFlight('spam_stats')
+
 class RegistrationView(APIView):
     permission_classes = []  # Allow unauthenticated access
     authentication_classes = []  # No authentication needed for registration
     parser_classes = (JSONParser,)  # Only accept JSON data
     
     def post(self, request, *args, **kwargs):
-        logger.info(f"Registration attempt with data: {request.data}")
-        
         try:
             # Validate request data presence
             if not isinstance(request.data, dict):
@@ -37,6 +58,8 @@ class RegistrationView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            logger.info(f"Registration attempt for username: {request.data.get('username')}")
+
             # Basic data validation
             required_fields = ['username', 'password', 'phone_number']
             missing_fields = [field for field in required_fields if not request.data.get(field)]
@@ -55,23 +78,16 @@ class RegistrationView(APIView):
                 phone_number = '+' + phone_number
                 request.data['phone_number'] = phone_number
 
-            # Check if username exists
-            if User.objects.filter(username=request.data.get('username')).exists():
-                return Response(
-                    {'error': 'Username already exists'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Check if phone number exists
-            if User.objects.filter(phone_number=phone_number).exists():
-                return Response(
-                    {'error': 'Phone number already registered'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
             serializer = UserRegistrationSerializer(data=request.data)
             if serializer.is_valid():
-                user = serializer.save()
+                # Uniqueness is left to the database's unique constraints; in
+                # autocommit the failed INSERT needs no transaction around it
+                try:
+                    user = serializer.save()
+                except IntegrityError as e:
+                    return self.integrity_error_response(e)
+
+                record_registration(user)
                 # Get tokens for the user
                 refresh = RefreshToken.for_user(user)
                 return Response(
@@ -104,6 +120,38 @@ class RegistrationView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def integrity_error_response(self, error):
+        """
+        Map a unique-constraint violation on insert to the field that caused it
+        """
+        message = str(error)
+        # PostgreSQL names the constraint; other backends name the column
+        # (e.g. "UNIQUE constraint failed: api_user.username")
+        constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None) or message
+
+        if 'phone_number' in constraint:
+            return Response(
+                {
+                    'error': 'Phone number already registered',
+                    'details': {'phone_number': ['A user with this phone number already exists.']}
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if 'username' in constraint:
+            return Response(
+                {
+                    'error': 'Username already exists',
+                    'details': {'username': ['A user with that username already exists.']}
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logger.error(f"Database integrity error in registration: {message}")
+        return Response(
+            {'error': 'Invalid data'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
 class ContactViewSet(viewsets.ModelViewSet):
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
@@ -123,7 +171,9 @@ class ContactViewSet(viewsets.ModelViewSet):
                 logger.warning(f"Contact already exists for user {self.request.user.username}")
                 raise ValidationError('Contact with this phone number already exists')
                 
-            serializer.save(user=self.request.user)
+            contact = serializer.save(user=self.request.user)
+            add_contact_name(contact.phone_number, contact.name)
+            reverse_contacts.invalidate(contact.phone_number)
             logger.info(f"Contact created successfully for user {self.request.user.username}")
             
         except IntegrityError as e:
@@ -133,6 +183,56 @@ class ContactViewSet(viewsets.ModelViewSet):
             logger.error(f"Error creating contact: {str(e)}")
             raise ValidationError(f'Error creating contact: {str(e)}')
 
+    def perform_update(self, serializer):
+        previous_number, previous_name = serializer.instance.phone_number, serializer.instance.name
+        contact = serializer.save()
+        if (previous_number, previous_name) != (contact.phone_number, contact.name):
+            remove_contact_name(previous_number, previous_name)
+            add_contact_name(contact.phone_number, contact.name)
+        reverse_contacts.invalidate(previous_number, contact.phone_number)
+
+    def perform_destroy(self, instance):
+        phone_number, name = instance.phone_number, instance.name
+        instance.delete()
+        remove_contact_name(phone_number, name)
+        reverse_contacts.invalidate(phone_number)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_contacts(self, request):
+        """
+        Queue a bulk contact upload; returns 202 with the job to poll
+        """
+        serializer = ContactImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Invalid data', 'details': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        contacts = serializer.validated_data['contacts']
+        # Re-posting the same upload while it is pending returns the same job
+        digest = hashlib.sha1(json.dumps(contacts, sort_keys=True).encode()).hexdigest()
+        job = jobs.enqueue(
+            'import_contacts',
+            payload={'user_id': request.user.id, 'contacts': contacts},
+            dedup_key=f'import_contacts:{request.user.id}:{digest}',
+            created_by=request.user
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='saved-by')
+    def saved_by(self, request):
+        """
+        List the registered users who have the current user's number saved
+        """
+        savers = reverse_contacts.get_savers(request.user.phone_number)
+        queryset = User.objects.filter(id__in=savers).order_by('username')
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(UserSerializer(page, many=True).data)
+        return Response(UserSerializer(queryset, many=True).data)
+
     def create(self, request, *args, **kwargs):
         try:
             return super().create(request, *args, **kwargs)
@@ -164,10 +264,114 @@ class ContactViewSet(viewsets.ModelViewSet):
 class SearchView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get_spam_likelihood(self, phone_number):
-        total_users = User.objects.count()
-        spam_count = SpamReport.objects.filter(phone_number=phone_number).count()
-        return (spam_count / total_users) * 100 if total_users > 0 else 0
+    PREFIX_REGEX = re.compile(r'^\+\d{4,15}$')
+    PREFIX_PAGE_SIZE = 20
+    PREFIX_MAX_PAGE_SIZE = 100
+    PREFIX_STATS_TTL = 60
+
+    def lookup_directory(self, phone_number):
+        # One indexed read of the directory projection instead of scanning
+        # every address book for the number
+        entry = PhoneDirectory.objects.select_related('registered_user').filter(
+            phone_number=phone_number
+        ).first()
+        if entry is None:
+            # Not projected yet (e.g. before the first rebuild_directory);
+            # build the entry from the source tables
+            entry = build_entry(phone_number)
+        if entry is None:
+            return None, 0
+        return entry, scoring.get_likelihood(phone_number)
+
+    def search_phone(self, request, phone_number):
+        entry, spam_likelihood = directory_flight.do(
+            phone_number, lambda: self.lookup_directory(phone_number)
+        )
+        if entry is None:
+            return []
+
+        registered_user = entry.registered_user
+        if registered_user:
+            # Return only registered user if found; email only if the
+            # searcher is in their contacts
+            savers = reverse_contacts.get_savers(request.user.phone_number)
+            return [{
+                'name': registered_user.username,
+                'phone_number': registered_user.phone_number,
+                'spam_likelihood': spam_likelihood,
+                'email': registered_user.email if registered_user.id in savers else None,
+                'is_registered': True
+            }]
+
+        if not entry.top_name:
+            return []
+
+        return [{
+            'name': entry.top_name,
+            'phone_number': entry.phone_number,
+            'spam_likelihood': spam_likelihood,
+            'is_registered': False
+        }]
+
+    def prefix_stats(self, numbers, prefix):
+        """
+        Aggregate over every number under the prefix; cached briefly, as
+        short prefixes cover large parts of the directory
+        """
+        key = f'prefix_stats:{prefix}'
+        stats = cache.get(key)
+        if stats is None:
+            stats = numbers.aggregate(
+                numbers=Count('id'),
+                reported_numbers=Count('id', filter=Q(spam_count__gt=0)),
+                total_reports=Sum('spam_count')
+            )
+            stats['total_reports'] = stats['total_reports'] or 0
+            cache.set(key, stats, self.PREFIX_STATS_TTL)
+        return stats
+
+    def search_prefix(self, request, prefix):
+        # An explicit range on the unique phone_number btree index, so pages
+        # are bounded index range scans in phone_number order (a LIKE would
+        # need the varchar_pattern_ops index, which cannot serve ORDER BY
+        # under a non-C collation)
+        numbers = PhoneDirectory.objects.filter(phone_number__gte=prefix)
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            numbers = numbers.filter(phone_number__lt=upper)
+
+        try:
+            limit = min(int(request.query_params.get('limit', self.PREFIX_PAGE_SIZE)), self.PREFIX_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = self.PREFIX_PAGE_SIZE
+        limit = max(limit, 1)
+
+        # Keyset pagination: resume after the last number of the previous page
+        page = numbers.order_by('phone_number')
+        after = request.query_params.get('after')
+        if after:
+            page = page.filter(phone_number__gt=normalize_phone_number(after))
+        page = list(page.values('phone_number', 'top_name', 'spam_count')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        likelihoods = scoring.get_likelihoods(row['phone_number'] for row in page)
+
+        return {
+            'prefix': prefix,
+            # Only the first page carries the prefix-wide statistics
+            'stats': None if after else self.prefix_stats(numbers, prefix),
+            'results': [
+                {
+                    'name': row['top_name'],
+                    'phone_number': row['phone_number'],
+                    'spam_likelihood': likelihoods[row['phone_number']],
+                    'total_reports': row['spam_count']
+                }
+                for row in page
+            ],
+            'next_after': page[-1]['phone_number'] if has_more else None
+        }
 
     def get(self, request):
         try:
@@ -180,12 +384,21 @@ class SearchView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if search_type not in ['name', 'phone']:
+            if search_type not in ['name', 'phone', 'prefix']:
                 return Response(
-                    {"error": "Search type must be either 'name' or 'phone'"},
+                    {"error": "Search type must be one of 'name', 'phone' or 'prefix'"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            if search_type == 'prefix':
+                prefix = normalize_phone_number(query)
+                if not self.PREFIX_REGEX.match(prefix):
+                    return Response(
+                        {"error": "Prefix must contain between 4 and 15 digits"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                return Response(self.search_prefix(request, prefix))
+
             results = []
             if search_type == 'name':
                 # First get exact matches
@@ -204,40 +417,22 @@ class SearchView(APIView):
                     ).distinct()
 
             else:  # phone search
-                # Clean phone number
-                if not query.startswith('+'):
-                    query = '+' + query
+                return Response(self.search_phone(request, normalize_phone_number(query)))
 
-                # First check registered users
-                registered_user = User.objects.filter(phone_number=query).first()
-                if registered_user:
-                    # Return only registered user if found
-                    results.append({
-                        'name': registered_user.username,
-                        'phone_number': registered_user.phone_number,
-                        'spam_likelihood': self.get_spam_likelihood(query),
-                        'email': registered_user.email if Contact.objects.filter(
-                            user=request.user,
-                            phone_number=query
-                        ).exists() else None,
-                        'is_registered': True
-                    })
-                    return Response(results)
-
-                # If no registered user found, search contacts
-                contacts = Contact.objects.filter(phone_number=query).distinct()
+            # Users who have the searcher saved, resolved once for the page
+            savers = reverse_contacts.get_savers(request.user.phone_number)
 
             # Process contacts
-            seen_numbers = set()
+            unique_contacts = {}
             for contact in contacts:
-                if contact.phone_number in seen_numbers:
-                    continue
-                seen_numbers.add(contact.phone_number)
+                unique_contacts.setdefault(contact.phone_number, contact)
+            likelihoods = scoring.get_likelihoods(unique_contacts)
 
+            for contact in unique_contacts.values():
                 result = {
                     'name': contact.name,
                     'phone_number': contact.phone_number,
-                    'spam_likelihood': self.get_spam_likelihood(contact.phone_number),
+                    'spam_likelihood': likelihoods[contact.phone_number],
                     'is_registered': False
                 }
 
@@ -246,10 +441,7 @@ class SearchView(APIView):
                 if registered_user:
                     result['is_registered'] = True
                     # Add email only if the searcher is in their contacts
-                    if Contact.objects.filter(
-                        user=registered_user,
-                        phone_number=request.user.phone_number
-                    ).exists():
+                    if registered_user.id in savers:
                         result['email'] = registered_user.email
 
                 results.append(result)
@@ -284,24 +476,22 @@ class SpamViewSet(viewsets.ModelViewSet):
                 phone_number = '+' + phone_number
                 request.data['phone_number'] = phone_number
 
-            # Check if already reported
-            if SpamReport.objects.filter(
-                reported_by=request.user,
-                phone_number=phone_number
-            ).exists():
-                return Response(
-                    {"error": "You have already reported this number"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
+            already_reported = Response(
+                {"error": "You have already reported this number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
+            try:
+                if self.perform_create(serializer) is None:
+                    return already_reported
+            except IntegrityError:
+                # A concurrent request filed the same report first
+                return already_reported
 
             # Get updated spam stats
-            total_users = User.objects.count()
-            spam_count = SpamReport.objects.filter(phone_number=phone_number).count()
-            spam_likelihood = (spam_count / total_users) * 100 if total_users > 0 else 0
+            spam_count = count_reports([phone_number])[phone_number]
+            spam_likelihood = scoring.get_likelihood(phone_number)
 
             return Response({
                 'message': 'Number reported as spam successfully',
@@ -317,8 +507,73 @@ class SpamViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def lock_reporter(self):
+        # Serializes a user's report writes, so checking for a duplicate and
+        # saving cannot interleave; a partitioned report table has no unique
+        # (reported_by, phone_number) constraint to fall back on
+        User.objects.select_for_update().only('id').get(pk=self.request.user.pk)
+
     def perform_create(self, serializer):
-        serializer.save(reported_by=self.request.user)
+        """
+        Save the report unless the user already reported the number
+        (including compacted reports); returns None in that case.
+        """
+        with transaction.atomic():
+            self.lock_reporter()
+            if has_reported(self.request.user.id, serializer.validated_data['phone_number']):
+                return None
+            report = serializer.save(reported_by=self.request.user)
+        record_spam_report(report.phone_number)
+        scoring.record_report(report)
+        try:
+            leaderboard.record_report(report.phone_number, report.created_at)
+        except Exception as e:
+            # The report is saved; reconciliation restores the missed count
+            logger.warning(f"Could not count report in leaderboard: {str(e)}")
+        return report
+
+    def perform_update(self, serializer):
+        previous_number = serializer.instance.phone_number
+        phone_number = serializer.validated_data.get('phone_number', previous_number)
+        with transaction.atomic():
+            self.lock_reporter()
+            if phone_number != previous_number and has_reported(self.request.user.id, phone_number):
+                raise exceptions.ValidationError({'error': 'You have already reported this number'})
+            report = serializer.save()
+        refresh_spam_count(report.phone_number)
+        if previous_number != report.phone_number:
+            refresh_spam_count(previous_number)
+        scoring.refresh_numbers({previous_number, report.phone_number})
+
+    def perform_destroy(self, instance):
+        phone_number, reporter_id, created_at = instance.phone_number, instance.reported_by_id, instance.created_at
+        instance.delete()
+        refresh_spam_count(phone_number)
+        scoring.refresh_after_removal(phone_number, reporter_id, created_at)
+
+    def get_spam_stats(self, phone_number):
+        """
+        Per-number stats shared by every caller of `check`
+        """
+        spam_reports = SpamReport.objects.filter(phone_number=phone_number)
+        spam_count = count_reports([phone_number])[phone_number]
+
+        # Get recent reporters
+        recent_reporters = []
+        if spam_count > 0:
+            recent_reporters = [
+                {
+                    'username': report.reported_by.username,
+                    'date': report.created_at
+                }
+                for report in spam_reports.select_related('reported_by').order_by('-created_at')[:5]
+            ]
+
+        return {
+            'spam_likelihood': scoring.get_likelihood(phone_number),
+            'total_reports': spam_count,
+            'recent_reporters': recent_reporters
+        }
 
     @action(detail=False, methods=['get'])
     def check(self, request):
@@ -334,27 +589,19 @@ class SpamViewSet(viewsets.ModelViewSet):
             if not phone_number.startswith('+'):
                 phone_number = '+' + phone_number
 
-            total_users = User.objects.count()
-            spam_reports = SpamReport.objects.filter(phone_number=phone_number)
-            spam_count = spam_reports.count()
-            
-            # Get recent reporters
-            recent_reporters = []
-            if spam_count > 0:
-                recent_reporters = [
-                    {
-                        'username': report.reported_by.username,
-                        'date': report.created_at
-                    }
-                    for report in spam_reports.order_by('-created_at')[:5]
-                ]
+            stats = spam_stats_flight.do(phone_number, lambda: self.get_spam_stats(phone_number))
+
+            # Read-only tier: the same block list offline clients receive
+            snapshot = snapshots.get_latest_snapshot()
 
             return Response({
                 'phone_number': phone_number,
-                'spam_likelihood': (spam_count / total_users) * 100 if total_users > 0 else 0,
-                'total_reports': spam_count,
-                'recent_reporters': recent_reporters,
-                'is_reported_by_you': spam_reports.filter(reported_by=request.user).exists()
+                'spam_likelihood': stats['spam_likelihood'],
+                'total_reports': stats['total_reports'],
+                'recent_reporters': stats['recent_reporters'],
+                'is_reported_by_you': has_reported(request.user.id, phone_number),
+                'is_blocklisted': snapshot is not None and snapshot.lookup(phone_number) is not None,
+                'blocklist_version': snapshot.version if snapshot is not None else None
             })
 
         except Exception as e:
@@ -364,6 +611,174 @@ class SpamViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream per-number spam aggregates as NDJSON (default) or CSV.
+        Pass the X-Export-Watermark header of a previous export as `since`
+        to only receive numbers reported after it.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": "export_format must be either 'ndjson' or 'csv'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        since = request.query_params.get('since')
+        try:
+            since = parse_watermark(since) if since else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Taken before reading so reports arriving mid-export are picked up next time
+        watermark = next_watermark()
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(
+            render_export(spam_aggregates(since=since), export_format),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="spam-export.{export_format}"'
+        response['X-Export-Watermark'] = watermark.isoformat()
+        return response
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def leaderboard(self, request):
+        """
+        Most-reported numbers in the last hour or day
+        """
+        window = request.query_params.get('window', 'hour')
+        if window not in leaderboard.WINDOWS:
+            return Response(
+                {"error": "window must be either 'hour' or 'day'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), leaderboard.MAX_SIZE)
+        except ValueError:
+            limit = 10
+        limit = max(limit, 1)
+
+        return Response({
+            'window': window,
+            'results': leaderboard.get_leaderboard(window, limit)
+        })
+
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        Describe the latest binary spam-list snapshot
+        """
+        versions = snapshots.list_versions()
+        if not versions:
+            return Response(
+                {'error': 'No spam snapshot has been built yet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        latest = snapshots.SpamSnapshot(snapshots.snapshot_path(versions[-1]))
+        try:
+            return Response({
+                'version': latest.version,
+                'record_count': latest.record_count,
+                'threshold': latest.threshold,
+                'created_at': latest.created_at,
+                'available_versions': versions
+            })
+        finally:
+            latest.close()
+
+    @action(detail=False, methods=['get'], url_path='snapshot/download')
+    def snapshot_download(self, request):
+        """
+        Download a full snapshot (`version`, defaults to the latest)
+        """
+        versions = snapshots.list_versions()
+        version = request.query_params.get('version')
+        try:
+            version = int(version) if version else (versions[-1] if versions else None)
+        except ValueError:
+            return Response({'error': 'version must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if version not in versions:
+            return Response({'error': 'Snapshot version not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = FileResponse(
+            open(snapshots.snapshot_path(version), 'rb'),
+            as_attachment=True,
+            content_type='application/octet-stream'
+        )
+        response['ETag'] = f'"spamlist-{version}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='snapshot/delta')
+    def snapshot_delta(self, request):
+        """
+        Download the delta from `from_version` to the version after it
+        """
+        try:
+            from_version = int(request.query_params.get('from_version', ''))
+        except ValueError:
+            return Response(
+                {'error': 'from_version parameter is required and must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        path = snapshots.delta_path(from_version, from_version + 1)
+        try:
+            delta = open(path, 'rb')
+        except FileNotFoundError:
+            return Response(
+                {'error': 'Delta not found; download the full snapshot instead'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        response = FileResponse(delta, as_attachment=True, content_type='application/octet-stream')
+        response['ETag'] = f'"spamlist-{from_version}-{from_version + 1}"'
+        return response
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of background jobs. Users see the jobs they queued; admins see
+    all jobs and may queue maintenance tasks.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Job.objects.order_by('-created_at')
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Only admins can queue maintenance jobs'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        name = request.data.get('name')
+        if name not in MAINTENANCE_TASKS:
+            return Response(
+                {'error': f"name must be one of: {', '.join(MAINTENANCE_TASKS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            priority = int(request.data.get('priority', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'priority must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = jobs.enqueue(
+            name,
+            priority=priority,
+            dedup_key=name,
+            created_by=request.user
+        )
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
@@ -381,7 +796,8 @@ def health_check(request):
         
         return Response({
             'status': 'healthy',
-            'database': 'connected'
+            'database': 'connected',
+            'single_flight': single_flight.metrics()
         }, status=status.HTTP_200_OK)
     except OperationalError:
         return Response({
@@ -0,0 +1,8 @@
+# Loaded automatically by gunicorn from the project directory (Procfile and
+# render.yaml). Several threaded workers let concurrent lookups of the same
+# number be coalesced in-process, and across workers through the shared cache.
+import os
+
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
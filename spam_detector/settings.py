@@ -3,6 +3,7 @@ import sentry_sdk
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 from sentry_sdk.integrations.django import DjangoIntegration
 
 load_dotenv()
@@ -64,12 +65,31 @@ if not DEBUG and os.getenv('SENTRY_DSN'):
         send_default_pii=True
     )
 
-# Cache configuration - Using local memory cache instead of Redis
+# Cache configuration. `default` is per process and serves request throttling.
+# `shared` is seen by all web and worker processes (reverse-contact index,
+# single-flight coalescing, spam leaderboard): Redis when REDIS_URL is set,
+# otherwise a database table created with `manage.py createcachetable`, which
+# costs a few queries per access and is meant for small deployments.
+if os.getenv('REDIS_URL'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'api_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+        },
+    }
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    'shared': SHARED_CACHE,
 }
 
 # Logging configuration
@@ -169,6 +189,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: PASSWORD_HASHER selects the hasher for new passwords
+# (pbkdf2, scrypt or argon2); the others stay listed so existing hashes
+# still verify and are upgraded on login. argon2 needs argon2-cffi.
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'api.hashers.ConfigurableScryptPasswordHasher',
+    'argon2': 'api.hashers.ConfigurableArgon2PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'pbkdf2')
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(
+        f"PASSWORD_HASHER must be one of: {', '.join(_PASSWORD_HASHERS)} (got '{PASSWORD_HASHER}')"
+    )
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+PASSWORD_HASHER_PARAMS = {
+    'scrypt_work_factor': int(os.getenv('SCRYPT_WORK_FACTOR', 2 ** 14)),
+    'scrypt_block_size': int(os.getenv('SCRYPT_BLOCK_SIZE', 8)),
+    'scrypt_parallelism': int(os.getenv('SCRYPT_PARALLELISM', 1)),
+    'argon2_time_cost': int(os.getenv('ARGON2_TIME_COST', 2)),
+    'argon2_memory_cost': int(os.getenv('ARGON2_MEMORY_COST', 102400)),  # KiB
+    'argon2_parallelism': int(os.getenv('ARGON2_PARALLELISM', 8)),
+}
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+
 # Custom user model
 AUTH_USER_MODEL = 'api.User'
 
@@ -267,6 +313,21 @@ CORS_ALLOWED_ORIGINS = [
 PHONENUMBER_DEFAULT_REGION = 'US'
 PHONENUMBER_DB_FORMAT = 'E164'
 
+# Spam scoring: each report's weight halves every SPAM_SCORE_HALF_LIFE_DAYS,
+# and a decayed score of SPAM_SCORE_SATURATION maps to ~63% likelihood
+SPAM_SCORE_HALF_LIFE_DAYS = float(os.getenv('SPAM_SCORE_HALF_LIFE_DAYS', 30))
+SPAM_SCORE_SATURATION = float(os.getenv('SPAM_SCORE_SATURATION', 5))
+
+# Raw spam reports older than this are compacted into monthly rollups
+SPAM_REPORT_RETENTION_DAYS = int(os.getenv('SPAM_REPORT_RETENTION_DAYS', 180))
+
+# Spam list snapshots for offline consumers
+SPAM_SNAPSHOT_DIR = os.getenv('SPAM_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+# A fresh report from a new account alone scores ~18%, so listing takes the
+# equivalent of three such reports, from at least SPAM_SNAPSHOT_MIN_REPORTERS users
+SPAM_SNAPSHOT_THRESHOLD = float(os.getenv('SPAM_SNAPSHOT_THRESHOLD', 40))  # spam likelihood, percent
+SPAM_SNAPSHOT_MIN_REPORTERS = int(os.getenv('SPAM_SNAPSHOT_MIN_REPORTERS', 3))
+
 # Debug toolbar settings
 INTERNAL_IPS = ['127.0.0.1']
 